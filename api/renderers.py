@@ -0,0 +1,56 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+# Decimal, lazy translation strings, querysets, ... the same way DRF's JSON
+# encoder does; orjson handles datetimes and UUIDs itself.
+default = encoders.JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in ``JSONRenderer`` using orjson, several times faster on large
+    part pages. Falls back to the stdlib renderer when orjson is missing or
+    an indented response was requested.
+    """
+
+    # List field errors are keyed by item index
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=default, option=self.options)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack bodies for clients sending ``Accept: application/msgpack``
+    (or ``?format=msgpack``), with the same payload as the JSON renderer.
+    """
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackRenderer requires msgpack')
+        return msgpack.packb(data, default=default, use_bin_type=True)
@@ -0,0 +1,65 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Backends private to each process: a version bump only reaches the worker
+# that handled the write
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared():
+    """
+    Whether the default cache is shared between workers (Redis, memcached,
+    database), so version bumps invalidate entries everywhere.
+    """
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_BACKENDS
+
+
+def version_key(namespace):
+    return f'cache-version:{namespace}'
+
+
+def get_versions(namespaces):
+    """
+    Current version of each namespace. A namespace without a version (never
+    bumped, or evicted) gets a fresh time based one, so entries cached under an
+    older version can never be served again.
+    """
+    keys = {version_key(namespace): namespace for namespace in namespaces}
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(namespace):
+    key = version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, None)
+        return version
+
+
+def response_cache_key(namespaces, request, params=()):
+    """
+    Cache key of a GET response: the path and the values of the query
+    ``params`` the view reads, so unrelated params (cache busters, tracking
+    tags) share one entry.
+    """
+    query = '&'.join(
+        f'{name}={value}'
+        for name in sorted(params)
+        for value in sorted(request.query_params.getlist(name))
+    )
+    versions = '.'.join(str(version) for version in get_versions(namespaces))
+    digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'response:{versions}:{digest}'
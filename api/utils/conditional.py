@@ -0,0 +1,33 @@
+import hashlib
+
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest())
+
+
+def set_validators(response, etag, last_modified=None):
+    """
+    Set the ETag / Last-Modified validators. The representation depends on
+    the negotiated renderer, so shared caches must key it on Accept too.
+    """
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept'])
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    A 304 (or 412) response when the request's If-None-Match /
+    If-Modified-Since preconditions match, otherwise None.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
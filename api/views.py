@@ -1,21 +1,54 @@
+from django.core.cache import cache
 from requests import Response
 from rest_framework import permissions, views, viewsets
-from rest_framework.pagination import PageNumberPagination
 
+from api.utils.cache import is_shared, response_cache_key
 from api.utils.response import APIResponse
 from rest_framework import status
+from .pagination import ServerPageNumberPagination
 from .permissions import IsOwnerOrReadOnly, IsTraderOrReadOnly
 
 
 class ServerModelViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    pagination_class = PageNumberPagination
+    pagination_class = ServerPageNumberPagination
 
 
 class ServerAPIView(views.APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 
+class CachedServerAPIView(ServerAPIView):
+    """
+    Caches GET payloads per path and ``cache_params`` query params, the ones
+    ``get_data`` reads. Entries are dropped by bumping the version of one of
+    ``cache_namespaces`` (see api.utils.cache). Bumps only reach every worker
+    through a shared cache; with a per-process cache, entries live
+    ``local_cache_timeout`` seconds at most so other workers catch up
+    quickly. Subclasses implement ``get_data(request)`` instead of ``get``.
+    """
+
+    cache_namespaces = ()
+    cache_params = ()
+    cache_timeout = 60 * 60 * 24
+    local_cache_timeout = 60
+    get_data = None
+
+    def get(self, request, *args, **kwargs):
+        assert self.get_data is not None, (
+            f"'{self.__class__.__name__}' should define a `get_data()` method."
+        )
+        key = response_cache_key(self.cache_namespaces, request, self.cache_params)
+        data = cache.get(key)
+        if data is None:
+            data = self.get_data(request, *args, **kwargs)
+            timeout = self.cache_timeout
+            if not is_shared():
+                timeout = min(timeout, self.local_cache_timeout)
+            cache.set(key, data, timeout)
+        return APIResponse(data=data)
+
+
 class DashboardModelViewSet(viewsets.ModelViewSet):
     permission_classes = [
         permissions.IsAuthenticated,
@@ -1,10 +1,14 @@
 from django.contrib import admin
-from django.db.models import Count, Sum
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.db.models.functions import Now
+from django.http import HttpResponseRedirect
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 
 from accounts.models import TraderProfile
 
+from . import category_counts, inventory, reservations
 from .models import *
 
 
@@ -35,6 +39,14 @@ class InventoryLogInline(admin.TabularInline):
     classes = ['collapse']
 
 
+class OEMReferenceInline(admin.TabularInline):
+    model = OEMReference
+    extra = 0
+    fields = ('raw_number', 'number', 'brand', 'source')
+    readonly_fields = ('number', 'source')
+    autocomplete_fields = ['brand']
+
+
 class PartImageInline(admin.TabularInline):
     model = PartImage
     extra = 1
@@ -52,7 +64,12 @@ class PartImageInline(admin.TabularInline):
 class PartAdmin(admin.ModelAdmin):
     search_fields = ('name', 'sku', 'description', 'oem_number')
     list_filter = ('approved', 'trader', 'category', 'is_active', 'is_featured')
-    inlines = [CompatibilityInline, PartImageInline, InventoryLogInline]
+    inlines = [
+        CompatibilityInline,
+        OEMReferenceInline,
+        PartImageInline,
+        InventoryLogInline,
+    ]
     list_display = (
         'name',
         'trader',
@@ -72,6 +89,7 @@ class PartAdmin(admin.ModelAdmin):
         'approve_parts',
         'unapprove_parts',
         'mark_as_featured',
+        'stock_history',
     ]
     readonly_fields = ('created_at', 'updated_at')
     fieldsets = (
@@ -123,12 +141,16 @@ class PartAdmin(admin.ModelAdmin):
 
     @admin.action(description='Approve selected parts')
     def approve_parts(self, request, queryset):
-        updated = queryset.update(approved=True)
+        category_ids = set(queryset.values_list('category_id', flat=True))
+        updated = queryset.update(approved=True, updated_at=timezone.now())
+        category_counts.recount(category_ids)
         self.message_user(request, f'{updated} parts have been approved.')
 
     @admin.action(description='Unapprove selected parts')
     def unapprove_parts(self, request, queryset):
-        updated = queryset.update(approved=False)
+        category_ids = set(queryset.values_list('category_id', flat=True))
+        updated = queryset.update(approved=False, updated_at=timezone.now())
+        category_counts.recount(category_ids)
         self.message_user(request, f'{updated} parts have been unapproved.')
 
     def stock_status_colored(self, obj):
@@ -150,24 +172,25 @@ class PartAdmin(admin.ModelAdmin):
 
     @admin.action(description='Restock selected parts')
     def restock_action(self, request, queryset):
-        for part in queryset:
-            part.restock(part.reorder_quantity, request.user)
-        self.message_user(request, f'{queryset.count()} parts have been restocked.')
+        restocked = inventory.restock_many(queryset, user=request.user)
+        self.message_user(request, f'{restocked} parts have been restocked.')
 
     @admin.action(description='Toggle active status')
     def toggle_active(self, request, queryset):
-        for part in queryset:
-            part.is_active = not part.is_active
-            part.save()
-        self.message_user(
-            request, f'Active status toggled for {queryset.count()} parts.'
-        )
+        toggled = inventory.toggle_active(queryset)
+        self.message_user(request, f'Active status toggled for {toggled} parts.')
 
     @admin.action(description='Mark as featured')
     def mark_as_featured(self, request, queryset):
-        queryset.update(is_featured=True)
+        queryset.update(is_featured=True, updated_at=timezone.now())
         self.message_user(request, f'{queryset.count()} parts marked as featured.')
 
+    @admin.action(description='Stock history')
+    def stock_history(self, request, queryset):
+        part_ids = ','.join(str(pk) for pk in queryset.values_list('pk', flat=True))
+        url = reverse('admin:store_inventorydailyrollup_changelist')
+        return HttpResponseRedirect(f'{url}?part__id__in={part_ids}')
+
     def view_orders(self, obj):
         count = OrderItem.objects.filter(part=obj).count()
         if count:
@@ -181,21 +204,32 @@ class PartAdmin(admin.ModelAdmin):
     view_orders.short_description = 'Orders'
 
 
+@admin.register(OEMSupersession)
+class OEMSupersessionAdmin(admin.ModelAdmin):
+    list_display = ('number', 'superseded_by', 'brand', 'created_at')
+    search_fields = ('number', 'superseded_by')
+    list_filter = ('brand',)
+
+
 @admin.register(CategoryParent)
 class CategoryParentAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug', 'child_categories_count', 'part_count')
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ('name', 'description')
 
+    def get_queryset(self, request):
+        return category_counts.annotate_parents(super().get_queryset(request))
+
     def child_categories_count(self, obj):
         return obj.children.count()
 
     child_categories_count.short_description = 'Child Categories'
 
     def part_count(self, obj):
-        return obj.parts.count()
+        return obj.part_count
 
     part_count.short_description = 'Parts'
+    part_count.admin_order_field = 'part_count'
 
 
 @admin.register(Category)
@@ -205,10 +239,14 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     list_filter = ('parent',)
 
+    def get_queryset(self, request):
+        return category_counts.annotate_categories(super().get_queryset(request))
+
     def part_count(self, obj):
-        return obj.parts.count()
+        return obj.part_count
 
     part_count.short_description = 'Parts'
+    part_count.admin_order_field = 'part_count'
 
 
 @admin.register(Brand)
@@ -322,7 +360,30 @@ class InventoryLogAdmin(admin.ModelAdmin):
         'created_at',
         'created_by',
     )
-    date_hierarchy = 'created_at'
+
+
+@admin.register(InventoryDailyRollup)
+class InventoryDailyRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        'part',
+        'day',
+        'inflow',
+        'outflow',
+        'adjustments',
+        'movements',
+        'closing_balance',
+    )
+    list_select_related = ('part',)
+    search_fields = ('part__name', 'part__sku')
+    date_hierarchy = 'day'
+    readonly_fields = list_display
+
+    def lookup_allowed(self, lookup, value):
+        # Stock history of the parts selected in the part changelist
+        return lookup == 'part__id__in' or super().lookup_allowed(lookup, value)
+
+    def has_add_permission(self, request):
+        return False
 
 
 @admin.register(StockReservation)
@@ -337,11 +398,42 @@ class StockReservationAdmin(admin.ModelAdmin):
     )
     list_filter = ('created_at', 'expires_at')
     search_fields = ('part__name', 'session_key')
+    actions = ['release_expired']
 
-    def is_expired(self, obj):
-        from django.utils import timezone
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related('part')
+            .annotate(
+                expired=ExpressionWrapper(
+                    Q(expires_at__lt=Now()), output_field=BooleanField()
+                )
+            )
+        )
 
-        return obj.expires_at < timezone.now()
+    def is_expired(self, obj):
+        return obj.expired
 
     is_expired.boolean = True
+    is_expired.admin_order_field = 'expires_at'
     is_expired.short_description = 'Expired'
+
+    # Rows only change through store.reservations, which keeps
+    # Part.reserved_quantity in step
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_model(self, request, obj):
+        reservations.discard(StockReservation.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        reservations.discard(queryset)
+
+    @admin.action(description='Release selected expired reservations')
+    def release_expired(self, request, queryset):
+        released = reservations.discard(queryset.filter(expires_at__lte=timezone.now()))
+        self.message_user(request, f'{released} expired reservations released.')
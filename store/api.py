@@ -11,16 +11,65 @@
 #     compatible_models__brand=mercedes
 # ).distinct()
 
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import filters
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import filters, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
 
+from accounts.models import TraderProfile
+from api.pagination import KeysetPagination
+from api.permissions import IsTraderOrReadOnly
+from api.utils.conditional import make_etag, not_modified, set_validators
 from api.utils.response import APIResponse
-from api.views import ServerAPIView, ServerModelViewSet
+from api.views import (CachedServerAPIView, PublicServerAPIView, ServerAPIView,
+                       ServerModelViewSet)
 
+from . import (category_counts, changes, exports, facets, fitment, imports,
+               lookup, oem, typeahead)
 from .models import Brand, CarModel, Category, CategoryParent, Part
+from .readers import PartReader
+from .search import PartSearchFilter
 from .serializers import (BrandFilterSerializer, CarModelFilterSerializer,
-                          CategoryFilterSerializer, PartSerializer,
+                          CategoryFilterSerializer, CategoryTreeSerializer,
+                          PartLookupSerializer, PartSerializer,
                           SubCategoryFilterSerializer)
+from .signals import TAXONOMY_CACHE
+
+
+def get_year(request):
+    """
+    The ``?year=`` model year filter as an int, or None when absent.
+    """
+    year = request.query_params.get('year')
+    if not year:
+        return None
+    try:
+        return int(year)
+    except ValueError:
+        raise ValidationError({'year': 'A valid year is required.'})
+
+
+def filter_parts(request, queryset):
+    """
+    Apply the vehicle, category and OEM number filters shared by the part list
+    and facets.
+    """
+    queryset = fitment.filter_parts(
+        queryset,
+        brand=request.query_params.get('brandId'),
+        car_model=request.query_params.get('compatibleModel'),
+        category=request.query_params.get('categoryId'),
+        year=get_year(request),
+    )
+    oem_number = request.query_params.get('oem')
+    if oem_number:
+        queryset = oem.filter_parts(queryset, oem_number)
+    return queryset
 
 
 class PartViewSet(ServerModelViewSet):
@@ -30,84 +79,277 @@ class PartViewSet(ServerModelViewSet):
 
     queryset = Part.objects.all()
     serializer_class = PartSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = [
-        'sku',
-        'category',
-        'name',
-        'compatible_models',
-        'compatible_models__brand',
-        'oem_number',
-    ]
+    filter_backends = [PartSearchFilter, filters.OrderingFilter]
     ordering_fields = ['is_featured', 'quantity', 'price']
+    keyset_pagination_class = KeysetPagination
+    keyset_ordering = ['-is_featured', 'price', 'id']
+    # Always read so keyset cursors can be built under sparse fieldsets
+    sort_columns = ['id', 'is_featured', 'quantity', 'price']
+
+    @property
+    def paginator(self):
+        """
+        Use keyset pagination when the client asks for ``?pagination=cursor``
+        (or follows a cursor link), page numbers otherwise.
+        """
+        if not hasattr(self, '_paginator'):
+            request = getattr(self, 'request', None)
+            params = request.query_params if request is not None else {}
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = self.keyset_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def list(self, request):
-        query_filters = {}
-        brandId = request.query_params.get('brandId')
-        categoryId = request.query_params.get('categoryId')
-        compatibleModel = request.query_params.get('compatibleModel')
-
-        if brandId is not None:
-            query_filters["compatible_models__brand"] = brandId
-        if categoryId is not None:
-            query_filters["category"] = categoryId
-        if compatibleModel is not None:
-            query_filters["compatible_models"] = compatibleModel
-
-        queryset = Part.objects.filter(**query_filters).distinct()
-        page_size = request.query_params.get('page_size', 20)
-        self.pagination_class.page_size = page_size
-        page = self.paginate_queryset(queryset)
+        queryset = filter_parts(
+            request, self.filter_queryset(Part.objects.order_by('id'))
+        )
+        # Catalog wide, so parts leaving the filtered set are noticed too
+        last_modified = changes.last_change()
+        etag = make_etag(
+            request.get_full_path(), request.accepted_renderer.format, last_modified
+        )
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        reader = PartReader.from_request(request, extra_columns=self.sort_columns)
+        rows = reader.values(queryset)
+        page = self.paginate_queryset(rows)
 
         if page is not None:
-            serializer = PartSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = PartSerializer(queryset, many=True)
-        return APIResponse(data=serializer.data)
+            response = self.get_paginated_response(reader.to_representation(page))
+        else:
+            response = APIResponse(data=reader.to_representation(rows))
+        return set_validators(response, etag, last_modified)
+
+    @action(detail=False, methods=['post'])
+    def lookup(self, request):
+        """
+        Resolve up to PART_LOOKUP_LIMIT SKUs / OEM numbers in one request.
+        """
+        serializer = PartLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = lookup.resolve(
+            serializer.validated_data['skus'], serializer.validated_data['oem_numbers']
+        )
+        return APIResponse(data=result)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every active, approved part matching the list filters as
+        NDJSON (default) or CSV (``?as=csv``), with constant memory use.
+        """
+        kind = request.query_params.get('as', 'ndjson')
+        if kind not in exports.CONTENT_TYPES:
+            raise ValidationError(
+                {'as': f'Choose one of: {", ".join(exports.CONTENT_TYPES)}.'}
+            )
+
+        queryset = Part.objects.filter(is_active=True, approved=True).order_by('id')
+        queryset = filter_parts(request, self.filter_queryset(queryset))
+        reader = PartReader.from_request(request)
+        response = StreamingHttpResponse(
+            exports.lines(reader, queryset, kind),
+            content_type=exports.CONTENT_TYPES[kind],
+        )
+        response['Content-Disposition'] = f'attachment; filename="parts.{kind}"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='changes', url_name='changes')
+    def changes_feed(self, request):
+        """
+        Parts changed or removed after ``?cursor=`` (or since the ISO
+        ``?since=`` timestamp), oldest first. Follow ``cursor`` until
+        ``has_more`` is false, then keep it for the next sync.
+        """
+        try:
+            limit = int(request.query_params.get('limit', changes.DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        limit = max(1, min(limit, changes.MAX_LIMIT))
+
+        position = None
+        token = request.query_params.get('cursor')
+        since = request.query_params.get('since')
+        if token:
+            try:
+                position = changes.decode_cursor(token)
+            except ValueError:
+                raise ValidationError({'cursor': 'Invalid cursor.'})
+        elif since:
+            since = parse_datetime(since)
+            if since is None:
+                raise ValidationError(
+                    {'since': 'A valid ISO 8601 datetime is required.'}
+                )
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            position = (since, changes.PART, 0)
+
+        reader = PartReader.from_request(request)
+        return APIResponse(data=changes.feed(reader, position, limit))
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        parser_classes=[MultiPartParser],
+        permission_classes=[permissions.IsAuthenticated, IsTraderOrReadOnly],
+    )
+    def import_parts(self, request):
+        """
+        Upsert the trader's parts from an uploaded CSV or XLSX ``file``;
+        ``?mode=delta`` only updates the price and stock of existing parts.
+        See ``store.imports.PartImporter`` for the columns.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'Upload a .csv or .xlsx file.'})
+        mode = request.query_params.get('mode', 'full')
+        if mode not in ('full', 'delta'):
+            raise ValidationError({'mode': 'Choose one of: full, delta.'})
+        trader = TraderProfile.objects.filter(user=request.user).first()
+        if trader is None:
+            raise PermissionDenied('Only traders can import parts.')
+
+        try:
+            created, updated, errors = imports.import_parts(
+                trader,
+                imports.read_rows(upload.file, upload.name),
+                delta=mode == 'delta',
+                user=request.user,
+            )
+        except ValueError as error:
+            raise ValidationError({'file': str(error)})
+        return APIResponse(
+            data={
+                'created': created,
+                'updated': updated,
+                'error_count': len(errors),
+                'errors': [
+                    {'row': line, 'message': message}
+                    for line, message in errors[: imports.MAX_REPORTED_ERRORS]
+                ],
+            }
+        )
 
     def retrieve(self, request, pk=None):
-        queryset = Part.objects.all()
-        Part = get_object_or_404(queryset, pk=pk)
-        serializer = PartSerializer(Part)
-        return APIResponse(data=serializer.data)
+        reader = PartReader.from_request(request, extra_columns=['updated_at'])
+        part = get_object_or_404(reader.values(Part.objects.all()), pk=pk)
+        etag = make_etag(
+            'part',
+            part['id'],
+            part['updated_at'],
+            request.accepted_renderer.format,
+            *reader.fields,
+        )
+        response = not_modified(request, etag, part['updated_at'])
+        if response is not None:
+            return response
+
+        response = APIResponse(data=reader.to_representation([part])[0])
+        return set_validators(response, etag, part['updated_at'])
 
 
 part_list = PartViewSet.as_view({'get': 'list'})
 part_detail = PartViewSet.as_view({'get': 'retrieve'})
 
 
-# filters
-class SubCategoryFiltersAPIView(ServerAPIView):
+class PartFacetsAPIView(ServerAPIView):
+    """
+    Brand, car model, category and price bucket counts for the parts matching
+    the same filters as the part list.
+    """
+
+    def get_parts(self):
+        queryset = PartSearchFilter().filter_queryset(
+            self.request, Part.objects.all(), self
+        )
+        return filter_parts(self.request, queryset)
+
+    def get(self, request):
+        data = facets.get_facets(request.query_params, self.get_parts)
+        return APIResponse(data=data)
+
+
+class AutocompleteAPIView(PublicServerAPIView):
+    """
+    Brand, car model and part suggestions for ``?q=``, answered from the
+    in-process typeahead index without a database query.
+    """
+
     def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', typeahead.DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        limit = max(1, min(limit, typeahead.MAX_LIMIT))
+        data = typeahead.index.suggest(request.query_params.get('q', ''), limit)
+        return APIResponse(data=data)
+
+
+# filters
+class SubCategoryFiltersAPIView(CachedServerAPIView):
+    cache_namespaces = (TAXONOMY_CACHE,)
+    cache_params = ('parentId',)
+
+    def get_data(self, request):
         parent = request.query_params.get('parentId')
         if parent:
             categories = Category.objects.filter(parent=parent)
         else:
             categories = Category.objects.all()
-        serializer = SubCategoryFilterSerializer(categories, many=True)
-        return APIResponse(data=serializer.data)
+        return SubCategoryFilterSerializer(categories, many=True).data
 
 
-class CategoryFiltersAPIView(ServerAPIView):
-    def get(self, request):
+class CategoryFiltersAPIView(CachedServerAPIView):
+    cache_namespaces = (TAXONOMY_CACHE,)
+
+    def get_data(self, request):
         categories = CategoryParent.objects.all()
-        serializer = CategoryFilterSerializer(categories, many=True)
-        return APIResponse(data=serializer.data)
+        return CategoryFilterSerializer(categories, many=True).data
 
 
-class BrandFilterAPIView(ServerAPIView):
-    def get(self, request):
+class CategoryTreeAPIView(CachedServerAPIView):
+    """
+    Category parents with their categories nested, and the part counts of
+    each from the ``CategoryPartCount`` rollup.
+    """
+
+    cache_namespaces = (TAXONOMY_CACHE, category_counts.CACHE_NAMESPACE)
+
+    def get_data(self, request):
+        children = category_counts.annotate_categories(Category.objects.all())
+        parents = category_counts.annotate_parents(
+            CategoryParent.objects.prefetch_related(
+                Prefetch('children', queryset=children)
+            )
+        )
+        return CategoryTreeSerializer(parents, many=True).data
+
+
+class BrandFilterAPIView(CachedServerAPIView):
+    cache_namespaces = (TAXONOMY_CACHE,)
+
+    def get_data(self, request):
         brands = Brand.objects.all()
-        serializer = BrandFilterSerializer(brands, many=True)
-        return APIResponse(data=serializer.data)
+        return BrandFilterSerializer(brands, many=True).data
 
 
-class CarModelFilterApiView(ServerAPIView):
-    def get(self, request):
+class CarModelFilterApiView(CachedServerAPIView):
+    cache_namespaces = (TAXONOMY_CACHE,)
+    cache_params = ('brandId', 'year')
+
+    def get_data(self, request):
         brand_id = request.query_params.get('brandId')
         if brand_id:
             car_models = CarModel.objects.filter(brand=brand_id)
         else:
             car_models = CarModel.objects.all()
-        serializer = CarModelFilterSerializer(car_models, many=True)
-        return APIResponse(data=serializer.data)
+        year = get_year(request)
+        if year is not None:
+            car_models = car_models.filter(fitment.built_in(year, field='id'))
+        return CarModelFilterSerializer(car_models, many=True).data
@@ -0,0 +1,125 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from api.utils.cache import bump_version
+
+from .models import CategoryPartCount, Part
+
+CACHE_NAMESPACE = 'store:category-counts'
+STATE_FIELDS = ('category_parent_id', 'category_id', 'is_active', 'approved')
+
+
+def state(values):
+    """
+    The rollup row a part is counted in and whether it counts as active, from
+    a (category_parent_id, category_id, is_active, approved) tuple.
+    """
+    category_parent_id, category_id, is_active, approved = values
+    return (category_parent_id, category_id), is_active and approved
+
+
+def part_state(part):
+    return state(tuple(getattr(part, field) for field in STATE_FIELDS))
+
+
+def stored_state(part_id):
+    values = Part.objects.filter(pk=part_id).values_list(*STATE_FIELDS).first()
+    return state(values) if values is not None else None
+
+
+def diff(old, new):
+    """
+    {(category_parent_id, category_id): (total delta, active delta)} moving a
+    part from ``old`` to ``new`` state; either may be None (created/deleted).
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for current, sign in ((old, -1), (new, 1)):
+        if current is None:
+            continue
+        key, active = current
+        deltas[key][0] += sign
+        deltas[key][1] += sign * active
+    return {key: tuple(delta) for key, delta in deltas.items() if any(delta)}
+
+
+def apply(deltas):
+    """
+    Add ``deltas`` (see ``diff``) to the rollup with atomic F() updates.
+    Rows are only created for keys a part moves into; decrements of missing
+    rows (e.g. while a category is being cascade deleted) are no-ops.
+    Returns whether anything changed.
+    """
+    if not deltas:
+        return False
+    with transaction.atomic():
+        CategoryPartCount.objects.bulk_create(
+            [
+                CategoryPartCount(category_parent_id=parent_id, category_id=category_id)
+                for (parent_id, category_id), (total, _) in deltas.items()
+                if total > 0
+            ],
+            ignore_conflicts=True,
+        )
+        for (parent_id, category_id), (total, active) in deltas.items():
+            CategoryPartCount.objects.filter(
+                category_parent_id=parent_id, category_id=category_id
+            ).update(total=F('total') + total, active=F('active') + active)
+    transaction.on_commit(lambda: bump_version(CACHE_NAMESPACE))
+    return True
+
+
+def recount(category_ids=None):
+    """
+    Recompute the rollup rows of the given categories (or of every category)
+    from the parts table, after ``QuerySet.update()`` calls that bypass the
+    part signals.
+    """
+    parts = Part.objects.all()
+    rows = CategoryPartCount.objects.all()
+    if category_ids is not None:
+        category_ids = set(category_ids)
+        parts = parts.filter(category_id__in=category_ids)
+        rows = rows.filter(category_id__in=category_ids)
+
+    counts = (
+        parts.order_by()
+        .values('category_parent_id', 'category_id')
+        .annotate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True, approved=True)),
+        )
+    )
+    with transaction.atomic():
+        rows.delete()
+        CategoryPartCount.objects.bulk_create(
+            [CategoryPartCount(**row) for row in counts]
+        )
+    transaction.on_commit(lambda: bump_version(CACHE_NAMESPACE))
+
+
+def _count(field, outer, count):
+    rows = (
+        CategoryPartCount.objects.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(count=Sum(count))
+        .values('count')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def annotate_categories(queryset, outer='pk'):
+    return queryset.annotate(
+        part_count=_count('category_id', outer, 'total'),
+        active_part_count=_count('category_id', outer, 'active'),
+    )
+
+
+def annotate_parents(queryset, outer='pk'):
+    return queryset.annotate(
+        part_count=_count('category_parent_id', outer, 'total'),
+        active_part_count=_count('category_parent_id', outer, 'active'),
+    )
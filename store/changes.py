@@ -0,0 +1,147 @@
+import base64
+import json
+from datetime import timedelta
+from heapq import merge
+
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Part, PartTombstone
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+# A transaction still in flight can commit rows with an updated_at older
+# than rows already served. Only changes older than this delay are served,
+# so a cursor never moves past a change that is not visible yet.
+SETTLE_DELAY = timedelta(seconds=5)
+
+# Parts sort before tombstones sharing the same timestamp
+PART, TOMBSTONE = 0, 1
+
+
+def last_change():
+    """
+    When the catalog last changed: the latest part update or removal (None
+    for an empty catalog). Compatibility and image changes touch their part,
+    so a part leaving any filtered list moves this marker too. Both lookups
+    read the end of an index.
+    """
+    updated = Part.objects.aggregate(latest=Max('updated_at'))['latest']
+    removed = PartTombstone.objects.aggregate(latest=Max('removed_at'))['latest']
+    return max(filter(None, (updated, removed)), default=None)
+
+
+def encode_cursor(position):
+    changed_at, kind, pk = position
+    payload = {'t': changed_at.isoformat(), 'k': kind, 'id': pk}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(token):
+    """
+    (changed_at, kind, id) position of ``token``; raises ValueError when the
+    token is malformed.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        changed_at = parse_datetime(payload['t'])
+        position = (changed_at, int(payload['k']), int(payload['id']))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if changed_at is None:
+        raise ValueError('Invalid cursor')
+    return position
+
+
+def _after(position, time_field, id_field, kind):
+    """
+    Rows of stream ``kind`` strictly after ``position`` in
+    (changed_at, kind, id) order.
+    """
+    changed_at, cursor_kind, pk = position
+    later = Q(**{f'{time_field}__gt': changed_at})
+    if kind > cursor_kind:
+        return later | Q(**{time_field: changed_at})
+    if kind == cursor_kind:
+        return later | Q(**{time_field: changed_at, f'{id_field}__gt': pk})
+    return later
+
+
+def _stream(queryset, time_field, id_field, kind, position, until, limit):
+    queryset = queryset.filter(**{f'{time_field}__lte': until})
+    if position is not None:
+        queryset = queryset.filter(_after(position, time_field, id_field, kind))
+    return queryset.order_by(time_field, id_field)[:limit]
+
+
+def changes_since(position=None, limit=DEFAULT_LIMIT):
+    """
+    Up to ``limit`` changes after ``position`` (a decoded cursor, or a
+    (datetime, 0, 0) start), oldest first, as (changed_at, kind, id, values)
+    tuples. Returns (changes, has_more).
+
+    Changed parts come from the (updated_at, id) index, deleted parts from
+    ``PartTombstone``; both streams are merged on one cursor.
+    """
+    until = timezone.now() - SETTLE_DELAY
+    parts = _stream(
+        Part.objects.values_list('updated_at', 'id', 'sku', 'is_active', 'approved'),
+        'updated_at',
+        'id',
+        PART,
+        position,
+        until,
+        limit + 1,
+    )
+    tombstones = _stream(
+        PartTombstone.objects.values_list('removed_at', 'part_id', 'sku'),
+        'removed_at',
+        'part_id',
+        TOMBSTONE,
+        position,
+        until,
+        limit + 1,
+    )
+    rows = merge(
+        ((changed_at, PART, pk, rest) for changed_at, pk, *rest in parts),
+        ((changed_at, TOMBSTONE, pk, rest) for changed_at, pk, *rest in tombstones),
+    )
+    changes = []
+    for row in rows:
+        if len(changes) == limit:
+            return changes, True
+        changes.append(row)
+    return changes, False
+
+
+def feed(reader, position=None, limit=DEFAULT_LIMIT):
+    """
+    Delta feed payload: parts that are active and approved are upserts with
+    their ``reader`` representation; deactivated, unapproved and deleted
+    parts are deletes.
+    """
+    changes, has_more = changes_since(position, limit)
+    live = [
+        pk
+        for _, kind, pk, rest in changes
+        if kind == PART and rest[1] and rest[2]  # is_active, approved
+    ]
+    rows = list(reader.values(Part.objects.filter(id__in=live)))
+    payloads = dict(zip((row['id'] for row in rows), reader.to_representation(rows)))
+
+    items = []
+    for changed_at, kind, pk, rest in changes:
+        item = {'id': pk, 'sku': rest[0], 'changed_at': changed_at}
+        if pk in payloads and kind == PART:
+            item.update(op=UPSERT, part=payloads[pk])
+        else:
+            item['op'] = DELETE
+        items.append(item)
+
+    if changes:
+        position = changes[-1][:3]
+    cursor = encode_cursor(position) if position is not None else None
+    return {'changes': items, 'cursor': cursor, 'has_more': has_more}
@@ -0,0 +1,66 @@
+import csv
+import json
+
+from api.renderers import default, orjson
+
+EXPORT_CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class Echo:
+    """
+    File-like object whose ``write`` returns the value, so ``csv.writer``
+    produces lines for a generator instead of buffering them.
+    """
+
+    def write(self, value):
+        return value
+
+
+def items(reader, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Serialized parts of ``queryset``, read through a server-side cursor
+    ``chunk_size`` rows at a time, with one image query per chunk.
+    """
+    chunk = []
+    for row in reader.values(queryset).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from reader.to_representation(chunk)
+            chunk = []
+    if chunk:
+        yield from reader.to_representation(chunk)
+
+
+def ndjson_lines(items):
+    for item in items:
+        if orjson is not None:
+            yield orjson.dumps(item, default=default) + b'\n'
+        else:
+            yield json.dumps(item, default=default, ensure_ascii=False) + '\n'
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        # images
+        return ' '.join(image['image'] or '' for image in value)
+    return value
+
+
+def csv_lines(fields, items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for item in items:
+        yield writer.writerow([csv_value(item[field]) for field in fields])
+
+
+def lines(reader, queryset, kind):
+    rows = items(reader, queryset)
+    if kind == 'csv':
+        return csv_lines(reader.fields, rows)
+    return ndjson_lines(rows)
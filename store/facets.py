@@ -0,0 +1,102 @@
+import hashlib
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from .models import PartFitment
+
+FACETS_CACHE_TIMEOUT = 60 * 5
+FACET_PARAMS = (
+    'brandId',
+    'compatibleModel',
+    'categoryId',
+    'year',
+    'oem',
+    'search',
+    'fuzzy',
+)
+PRICE_BUCKETS = (0, 25, 50, 100, 250, 500, 1000)
+
+
+def cache_key(params):
+    """
+    Cache key for a filter set, independent of parameter order, casing and
+    unrelated query params (page, ordering, ...).
+    """
+    normalized = '&'.join(
+        f'{name}={" ".join(params.get(name, "").lower().split())}'
+        for name in FACET_PARAMS
+        if params.get(name)
+    )
+    return 'store:facets:' + hashlib.md5(normalized.encode()).hexdigest()
+
+
+def _price_bucket():
+    whens = [
+        When(price__lt=upper, then=Value(index))
+        for index, upper in enumerate(PRICE_BUCKETS[1:])
+    ]
+    return Case(
+        *whens, default=Value(len(PRICE_BUCKETS) - 1), output_field=IntegerField()
+    )
+
+
+def _grouped(queryset, facet, key, count):
+    return (
+        queryset.order_by()
+        .annotate(facet_key=key)
+        .values('facet_key')
+        .annotate(facet=Value(facet), count=count)
+        .values_list('facet', 'facet_key', 'count')
+    )
+
+
+def compute(parts):
+    """
+    Per-brand, per-model, per-category and price bucket part counts for the
+    ``parts`` queryset, as a single UNION ALL of grouped aggregates.
+    """
+    parts = parts.order_by()
+    fitments = PartFitment.objects.filter(part_id__in=parts.values('id'))
+    queries = [
+        _grouped(fitments, 'brands', F('brand_id'), Count('part_id', distinct=True)),
+        _grouped(fitments, 'car_models', F('car_model_id'), Count('part_id')),
+        _grouped(parts, 'categories', F('category_id'), Count('id')),
+        _grouped(parts, 'prices', _price_bucket(), Count('id')),
+    ]
+    rows = queries[0].union(*queries[1:], all=True)
+
+    counts = defaultdict(dict)
+    for facet, key, count in rows:
+        counts[facet][key] = count
+
+    prices = []
+    for index, lower in enumerate(PRICE_BUCKETS):
+        upper = PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None
+        prices.append(
+            {'min': lower, 'max': upper, 'count': counts['prices'].get(index, 0)}
+        )
+    return {
+        'brands': _as_list(counts['brands']),
+        'car_models': _as_list(counts['car_models']),
+        'categories': _as_list(counts['categories']),
+        'prices': prices,
+    }
+
+
+def _as_list(counts):
+    return [{'id': key, 'count': count} for key, count in sorted(counts.items())]
+
+
+def get_facets(params, get_parts):
+    """
+    Cached facet counts for ``params``; ``get_parts`` builds the filtered part
+    queryset and is only called on a cache miss.
+    """
+    key = cache_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute(get_parts())
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models import Q
+
+from .models import CarModel, CarModelYear, Compatibility, PartFitment
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def _fitment_rows(compatibilities):
+    rows = compatibilities.values_list(
+        'part_id', 'car_model_id', 'car_model__brand_id', 'part__category_id'
+    )
+    for part_id, car_model_id, brand_id, category_id in rows.iterator(
+        chunk_size=REBUILD_BATCH_SIZE
+    ):
+        yield PartFitment(
+            part_id=part_id,
+            car_model_id=car_model_id,
+            brand_id=brand_id,
+            category_id=category_id,
+        )
+
+
+def _year_rows(car_models):
+    rows = car_models.filter(production_end__isnull=False).values_list(
+        'id', 'brand_id', 'production_start', 'production_end'
+    )
+    for car_model_id, brand_id, start, end in rows.iterator(
+        chunk_size=REBUILD_BATCH_SIZE
+    ):
+        for year in range(start, end + 1):
+            yield CarModelYear(car_model_id=car_model_id, brand_id=brand_id, year=year)
+
+
+def _bulk_insert(rows, model=PartFitment):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def rebuild(part_ids=None):
+    """
+    Rebuild the fitment index for the given parts, or for the whole catalog
+    when ``part_ids`` is None.
+    """
+    fitments = PartFitment.objects.all()
+    compatibilities = Compatibility.objects.all()
+    if part_ids is not None:
+        part_ids = list(part_ids)
+        fitments = fitments.filter(part_id__in=part_ids)
+        compatibilities = compatibilities.filter(part_id__in=part_ids)
+
+    with transaction.atomic():
+        fitments.delete()
+        _bulk_insert(_fitment_rows(compatibilities))
+
+
+def rebuild_years(car_model_ids=None):
+    """
+    Rebuild the production year buckets of the given car models, or of all of
+    them when ``car_model_ids`` is None.
+    """
+    years = CarModelYear.objects.all()
+    car_models = CarModel.objects.all()
+    if car_model_ids is not None:
+        car_model_ids = list(car_model_ids)
+        years = years.filter(car_model_id__in=car_model_ids)
+        car_models = car_models.filter(id__in=car_model_ids)
+
+    with transaction.atomic():
+        years.delete()
+        _bulk_insert(_year_rows(car_models), model=CarModelYear)
+
+
+def built_in(year, field='car_model_id'):
+    """
+    Q matching car models (through ``field``) in production during ``year``.
+    Ended models come from the CarModelYear buckets, models still in
+    production (``production_end IS NULL``) from a partial index on CarModel.
+    """
+    ended = CarModelYear.objects.filter(year=year).values('car_model_id')
+    in_production = CarModel.objects.filter(
+        production_end__isnull=True, production_start__lte=year
+    ).values('id')
+    return Q(**{f'{field}__in': ended}) | Q(**{f'{field}__in': in_production})
+
+
+def index_compatibility(compatibility, previous=None):
+    """
+    Index a saved compatibility. ``previous`` is the (part_id, car_model_id)
+    pair it had before the save; its row is dropped when the pair changed.
+    """
+    current = (compatibility.part_id, compatibility.car_model_id)
+    if previous is not None and previous != current:
+        PartFitment.objects.filter(
+            part_id=previous[0], car_model_id=previous[1]
+        ).delete()
+    PartFitment.objects.update_or_create(
+        part_id=compatibility.part_id,
+        car_model_id=compatibility.car_model_id,
+        defaults={
+            'brand_id': compatibility.car_model.brand_id,
+            'category_id': compatibility.part.category_id,
+        },
+    )
+
+
+def unindex_compatibility(compatibility):
+    PartFitment.objects.filter(
+        part_id=compatibility.part_id, car_model_id=compatibility.car_model_id
+    ).delete()
+
+
+def sync_part(part):
+    PartFitment.objects.filter(part_id=part.pk).exclude(
+        category_id=part.category_id
+    ).update(category_id=part.category_id)
+
+
+def sync_car_model(car_model):
+    PartFitment.objects.filter(car_model_id=car_model.pk).exclude(
+        brand_id=car_model.brand_id
+    ).update(brand_id=car_model.brand_id)
+    rebuild_years([car_model.pk])
+
+
+def filter_parts(queryset, brand=None, car_model=None, category=None, year=None):
+    """
+    Narrow a ``Part`` queryset by vehicle, model year and category.
+
+    Vehicle lookups go through ``PartFitment`` as an ``IN`` semi-join, so
+    a part fitting several models of the same brand is still returned once
+    without a DISTINCT over the result set.
+    """
+    if brand is None and car_model is None and year is None:
+        if category is not None:
+            queryset = queryset.filter(category=category)
+        return queryset
+
+    fitting = PartFitment.objects.all()
+    if year is not None:
+        fitting = fitting.filter(built_in(year))
+    lookups = {}
+    if brand is not None:
+        lookups['brand'] = brand
+    if car_model is not None:
+        lookups['car_model'] = car_model
+    if category is not None:
+        lookups['category'] = category
+    fitting = fitting.filter(**lookups).values('part_id')
+    return queryset.filter(id__in=fitting)
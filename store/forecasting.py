@@ -0,0 +1,159 @@
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import Part
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+HISTORY_DAYS = 90
+LEAD_TIME_DAYS = 7
+COVER_DAYS = 14
+SMOOTHING = 0.3
+# z score of a ~95% cycle service level
+SERVICE_FACTOR = 1.65
+CHUNK_SIZE = 50_000
+WRITE_BATCH_SIZE = 2000
+
+EMA = 'ema'
+SMA = 'sma'
+METHODS = (EMA, SMA)
+
+
+def demand_matrix(part_ids, since, days):
+    """
+    Daily sales outflow of ``part_ids`` (a sorted array) as a
+    (parts, days) array, day 0 being ``since``.
+    """
+    matrix = np.zeros((len(part_ids), days))
+    rows = list(rollups.daily_outflow(int(part_ids[0]), int(part_ids[-1]), since))
+    if not rows:
+        return matrix
+    parts, dates, units = zip(*rows)
+    parts = np.array(parts)
+    index = np.minimum(np.searchsorted(part_ids, parts), len(part_ids) - 1)
+    offsets = (
+        np.array(dates, dtype='datetime64[D]') - np.datetime64(since, 'D')
+    ).astype(int)
+    # Inactive parts inside the id range and days outside the window
+    keep = (part_ids[index] == parts) & (offsets >= 0) & (offsets < days)
+    np.add.at(matrix, (index[keep], offsets[keep]), np.array(units)[keep])
+    return matrix
+
+
+def forecast(matrix, method=EMA, smoothing=SMOOTHING):
+    """
+    Expected daily demand of every row of ``matrix`` and the standard
+    deviation of its forecast errors. ``EMA`` runs simple exponential
+    smoothing over the days, all parts at once; ``SMA`` is the mean over
+    the window.
+    """
+    if method == SMA:
+        return matrix.mean(axis=1), matrix.std(axis=1)
+
+    level = matrix[:, 0].copy()
+    squared_errors = np.zeros(len(matrix))
+    for day in range(1, matrix.shape[1]):
+        error = matrix[:, day] - level
+        squared_errors += error**2
+        level += smoothing * error
+    return level, np.sqrt(squared_errors / max(matrix.shape[1] - 1, 1))
+
+
+def suggest(
+    level,
+    deviation,
+    lead_time_days=LEAD_TIME_DAYS,
+    cover_days=COVER_DAYS,
+    service_factor=SERVICE_FACTOR,
+):
+    """
+    (low_stock_threshold, reorder_quantity) arrays: the reorder point covers
+    the expected demand over the lead time plus safety stock, and a reorder
+    covers ``cover_days`` of demand (at least one unit).
+    """
+    safety_stock = service_factor * deviation * np.sqrt(lead_time_days)
+    threshold = np.ceil(level * lead_time_days + safety_stock)
+    reorder = np.maximum(np.ceil(level * cover_days), 1)
+    return threshold.astype(np.int64), reorder.astype(np.int64)
+
+
+def _chunks(chunk_size):
+    last = 0
+    while True:
+        rows = list(
+            Part.objects.filter(is_active=True, pk__gt=last)
+            .order_by('pk')
+            .values_list('pk', 'low_stock_threshold', 'reorder_quantity')[:chunk_size]
+        )
+        if not rows:
+            return
+        yield np.array(rows, dtype=np.int64)
+        last = rows[-1][0]
+
+
+def run(
+    days=HISTORY_DAYS,
+    method=EMA,
+    smoothing=SMOOTHING,
+    lead_time_days=LEAD_TIME_DAYS,
+    cover_days=COVER_DAYS,
+    service_factor=SERVICE_FACTOR,
+    chunk_size=CHUNK_SIZE,
+    dry_run=False,
+):
+    """
+    Forecast the demand of every active part from the last ``days`` days of
+    sales and write the suggested thresholds and reorder quantities back
+    with ``bulk_update``, ``chunk_size`` parts at a time. Parts without
+    sales in the window keep their values. Returns (parts, parts with
+    demand, parts changed).
+    """
+    if np is None:
+        raise ImproperlyConfigured(
+            'Demand forecasting requires numpy (pip install -r requirements-ops.txt)'
+        )
+
+    since = timezone.localdate() - timedelta(days=days)
+    totals = [0, 0, 0]
+    for chunk in _chunks(chunk_size):
+        part_ids = chunk[:, 0]
+        matrix = demand_matrix(part_ids, since, days)
+        level, deviation = forecast(matrix, method, smoothing)
+        threshold, reorder = suggest(
+            level, deviation, lead_time_days, cover_days, service_factor
+        )
+        demand = matrix.any(axis=1)
+        changed = demand & ((threshold != chunk[:, 1]) | (reorder != chunk[:, 2]))
+
+        totals[0] += len(chunk)
+        totals[1] += int(demand.sum())
+        totals[2] += int(changed.sum())
+        if dry_run or not changed.any():
+            continue
+
+        now = timezone.now()
+        parts = [
+            Part(
+                pk=int(pk),
+                low_stock_threshold=int(low_stock_threshold),
+                reorder_quantity=int(reorder_quantity),
+                updated_at=now,
+            )
+            for pk, low_stock_threshold, reorder_quantity in zip(
+                part_ids[changed], threshold[changed], reorder[changed]
+            )
+        ]
+        with transaction.atomic():
+            Part.objects.bulk_update(
+                parts,
+                ['low_stock_threshold', 'reorder_quantity', 'updated_at'],
+                batch_size=WRITE_BATCH_SIZE,
+            )
+    return tuple(totals)
@@ -0,0 +1,421 @@
+import csv
+import io
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import category_counts, fitment, oem, search, typeahead
+from .models import (ADJUSTMENT, NEW, CarModel, Category, Compatibility,
+                     InventoryLog, Part, PartImage)
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover
+    openpyxl = None
+
+IMPORT_BATCH_SIZE = 1000
+# Row errors listed in an API response; the total is always reported
+MAX_REPORTED_ERRORS = 1000
+LIST_SEPARATOR = ';'
+NOTES = 'Bulk import'
+
+REQUIRED_COLUMNS = ('sku', 'name', 'category', 'price')
+TEXT_COLUMNS = {'name': 255, 'description': None, 'oem_number': 255}
+INTEGER_COLUMNS = (
+    'quantity',
+    'low_stock_threshold',
+    'reorder_quantity',
+    'warranty_months',
+)
+# Columns of a stock/price-only delta feed
+DELTA_COLUMNS = ('price', 'quantity')
+# Changes that move the part in the catalog indexes (search, autocomplete,
+# category counts, fitment, OEM references)
+INDEXED_FIELDS = {'name', 'description', 'oem_number', 'category_id', 'is_active'}
+
+MAX_PRICE = Decimal('99999999.99')
+MAX_INTEGER = 2147483647
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_csv(file):
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    yield from csv.DictReader(file)
+
+
+def read_xlsx(file):
+    """
+    Rows of the first sheet as dicts keyed by the header row, read in
+    openpyxl's streaming (read only) mode.
+    """
+    if openpyxl is None:
+        raise ValueError('XLSX imports require openpyxl')
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell or '').strip() for cell in next(rows, ())]
+        for values in rows:
+            if all(value is None or value == '' for value in values):
+                continue
+            yield {
+                column: '' if value is None else str(value)
+                for column, value in zip(header, values)
+            }
+    finally:
+        workbook.close()
+
+
+def read_rows(file, name):
+    """
+    Dict rows of an uploaded ``.csv`` or ``.xlsx`` file, parsed lazily.
+    """
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.csv':
+        return read_csv(file)
+    if extension == '.xlsx':
+        return read_xlsx(file)
+    raise ValueError(f"Unsupported file type {extension!r}, use .csv or .xlsx")
+
+
+def _text(row, column):
+    return (row.get(column) or '').strip()
+
+
+def _price(value):
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise RowError(f"Invalid price {value!r}")
+    if not price.is_finite() or price < 0 or price > MAX_PRICE:
+        raise RowError(f"Invalid price {value!r}")
+    if price != price.quantize(Decimal('0.01')):
+        raise RowError(f"Price {value!r} has more than 2 decimal places")
+    return price
+
+
+def _integer(value, column):
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        number = None
+    if (
+        number is None
+        or not number.is_finite()
+        or number != number.to_integral_value()
+        or not 0 <= number <= MAX_INTEGER
+    ):
+        raise RowError(f"Invalid {column} {value!r}")
+    return int(number)
+
+
+def _boolean(value, column):
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise RowError(f"Invalid {column} {value!r}")
+
+
+def _list(value):
+    return [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+
+
+class PartImporter:
+    """
+    Upsert a trader's parts by ``sku`` from dict rows, in batches of
+    ``batch_size`` with one transaction, one locking read and a handful of
+    bulk writes each.
+
+    A full import needs ``sku``, ``name``, ``category`` (slug or id) and
+    ``price``, and takes ``description``, ``oem_number``, ``quantity``,
+    ``low_stock_threshold``, ``reorder_quantity``, ``warranty_months``,
+    ``is_active``, ``car_models`` (car model ids) and ``images`` (stored
+    image paths), lists separated by ``;``. Blank optional cells keep the
+    current value; car models and images are only ever added. A ``delta``
+    import updates the ``price`` and/or ``quantity`` of existing parts.
+
+    Stock changes are logged (NEW for new parts, ADJUSTMENT otherwise) and
+    the indexes the save signals maintain are refreshed in bulk.
+    """
+
+    def __init__(self, trader, delta=False, user=None, batch_size=IMPORT_BATCH_SIZE):
+        self.trader = trader
+        self.delta = delta
+        self.user = user
+        self.batch_size = batch_size
+        self.created = self.updated = 0
+        self.errors = []
+        self.categories = {}
+
+    def run(self, rows):
+        """
+        Import ``rows``; returns (created, updated, errors) where errors are
+        (row number, message) pairs.
+        """
+        if not self.delta:
+            categories = Category.objects.values_list('pk', 'slug', 'parent_id')
+            for pk, slug, parent_id in categories:
+                self.categories[str(pk)] = (pk, parent_id)
+                if slug:
+                    self.categories[slug] = (pk, parent_id)
+
+        batch = []
+        for line, row in enumerate(rows, start=1):
+            try:
+                batch.append((line, self.parse(row)))
+            except RowError as error:
+                self.errors.append((line, str(error)))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self.created, self.updated, sorted(self.errors)
+
+    def parse(self, row):
+        """
+        Validated field values of ``row``; raises RowError.
+        """
+        sku = _text(row, 'sku')
+        if not sku:
+            raise RowError('Missing sku')
+        if len(sku) > 50:
+            raise RowError('sku is longer than 50 characters')
+        values = {'sku': sku}
+
+        if self.delta:
+            if _text(row, 'price'):
+                values['price'] = _price(_text(row, 'price'))
+            if _text(row, 'quantity'):
+                values['quantity'] = _integer(_text(row, 'quantity'), 'quantity')
+            if len(values) == 1:
+                raise RowError('Nothing to update, give a price or a quantity')
+            return values
+
+        for column in REQUIRED_COLUMNS:
+            if not _text(row, column):
+                raise RowError(f"Missing {column}")
+        category = self.categories.get(_text(row, 'category'))
+        if category is None:
+            raise RowError(f"Unknown category {_text(row, 'category')!r}")
+        if category[1] is None:
+            raise RowError(f"Category {_text(row, 'category')!r} has no parent")
+        values.update(
+            category_id=category[0],
+            category_parent_id=category[1],
+            price=_price(_text(row, 'price')),
+        )
+
+        for column, max_length in TEXT_COLUMNS.items():
+            value = _text(row, column)
+            if max_length and len(value) > max_length:
+                raise RowError(f"{column} is longer than {max_length} characters")
+            if value:
+                values[column] = value
+        for column in INTEGER_COLUMNS:
+            if _text(row, column):
+                values[column] = _integer(_text(row, column), column)
+        if _text(row, 'is_active'):
+            values['is_active'] = _boolean(_text(row, 'is_active'), 'is_active')
+
+        try:
+            values['car_models'] = {int(pk) for pk in _list(_text(row, 'car_models'))}
+        except ValueError:
+            raise RowError(f"Invalid car_models {_text(row, 'car_models')!r}")
+        values['images'] = _list(_text(row, 'images'))
+        if any(len(image) > 100 for image in values['images']):
+            raise RowError('Image paths are limited to 100 characters')
+        return values
+
+    def flush(self, batch):
+        with transaction.atomic():
+            parts = {
+                part.sku: part
+                for part in Part.objects.select_for_update()
+                .filter(sku__in={values['sku'] for _, values in batch})
+                .order_by('pk')
+            }
+            car_models = set()
+            if not self.delta:
+                car_models = set(
+                    CarModel.objects.filter(
+                        pk__in={
+                            pk for _, values in batch for pk in values['car_models']
+                        }
+                    ).values_list('pk', flat=True)
+                )
+
+            created, changed, links, stock, seen = [], {}, [], [], set()
+            categories, indexed = set(), set()
+            for line, values in batch:
+                sku = values['sku']
+                car_model_ids = values.pop('car_models', set())
+                images = values.pop('images', [])
+                part = parts.get(sku)
+                if sku in seen:
+                    self.errors.append((line, f"Duplicate sku {sku!r}"))
+                    continue
+                seen.add(sku)
+                if car_model_ids - car_models:
+                    unknown = ', '.join(map(str, sorted(car_model_ids - car_models)))
+                    self.errors.append((line, f"Unknown car models {unknown}"))
+                    continue
+
+                if part is None:
+                    if self.delta:
+                        self.errors.append((line, f"Unknown sku {sku!r}"))
+                        continue
+                    part = Part(trader=self.trader, **values)
+                    created.append(part)
+                    categories.add(part.category_id)
+                    if part.quantity:
+                        stock.append((part, part.quantity, NEW))
+                else:
+                    if part.trader_id != self.trader.pk:
+                        self.errors.append(
+                            (line, f"sku {sku!r} belongs to another trader")
+                        )
+                        continue
+                    quantity = values.get('quantity', part.quantity)
+                    if quantity < part.reserved_quantity:
+                        self.errors.append(
+                            (
+                                line,
+                                f"quantity {quantity} is below the "
+                                f"{part.reserved_quantity} reserved units",
+                            )
+                        )
+                        continue
+                    fields = {
+                        field
+                        for field, value in values.items()
+                        if getattr(part, field) != value
+                    }
+                    if quantity != part.quantity:
+                        stock.append((part, quantity - part.quantity, ADJUSTMENT))
+                    if fields & {'category_id', 'is_active'}:
+                        categories.update((part.category_id, values['category_id']))
+                    if fields & INDEXED_FIELDS:
+                        indexed.add(part.pk)
+                    for field in fields:
+                        setattr(part, field, values[field])
+                    if fields:
+                        changed[part.pk] = part
+                if car_model_ids or images:
+                    links.append((part, car_model_ids, images))
+
+            Part.objects.bulk_create(created)
+            indexed.update(part.pk for part in created)
+            self.link(links, changed, indexed, {part.pk for part in created})
+
+            now = timezone.now()
+            for part in changed.values():
+                part.updated_at = now
+            Part.objects.bulk_update(
+                changed.values(),
+                (
+                    ['price', 'quantity', 'updated_at']
+                    if self.delta
+                    else [
+                        'name',
+                        'description',
+                        'price',
+                        'quantity',
+                        'category',
+                        'category_parent',
+                        'oem_number',
+                        'low_stock_threshold',
+                        'reorder_quantity',
+                        'warranty_months',
+                        'is_active',
+                        'updated_at',
+                    ]
+                ),
+            )
+            InventoryLog.objects.bulk_create(
+                [
+                    InventoryLog(
+                        part=part,
+                        quantity=quantity,
+                        log_type=log_type,
+                        notes=NOTES,
+                        created_by=self.user,
+                    )
+                    for part, quantity, log_type in stock
+                ]
+            )
+            self.refresh(created, changed, categories, indexed)
+        self.created += len(created)
+        self.updated += len(changed)
+
+    def link(self, links, changed, indexed, created):
+        """
+        Add the new compatibilities and images of ``links`` ((part, car model
+        ids, image paths) triples), marking the existing parts they touch as
+        changed.
+        """
+        if not links:
+            return
+        part_ids = [part.pk for part, _, _ in links]
+        existing = set(
+            Compatibility.objects.filter(part_id__in=part_ids).values_list(
+                'part_id', 'car_model_id'
+            )
+        )
+        existing_images = set(
+            PartImage.objects.filter(part_id__in=part_ids).values_list(
+                'part_id', 'image'
+            )
+        )
+        compatibilities, images = [], []
+        for part, car_model_ids, paths in links:
+            new_links = [
+                Compatibility(part=part, car_model_id=car_model_id)
+                for car_model_id in sorted(car_model_ids)
+                if (part.pk, car_model_id) not in existing
+            ]
+            new_images = [
+                PartImage(part=part, image=path)
+                for path in dict.fromkeys(paths)
+                if (part.pk, path) not in existing_images
+            ]
+            if new_links:
+                indexed.add(part.pk)
+            if (new_links or new_images) and part.pk not in created:
+                changed.setdefault(part.pk, part)
+            compatibilities.extend(new_links)
+            images.extend(new_images)
+        Compatibility.objects.bulk_create(compatibilities, ignore_conflicts=True)
+        PartImage.objects.bulk_create(images)
+
+    def refresh(self, created, changed, categories, indexed):
+        """
+        Bring the fitment, OEM, category count, search and autocomplete
+        indexes up to date for the parts of a batch.
+        """
+        if categories:
+            category_counts.recount(categories)
+        if not indexed:
+            return
+        parts = {part.pk: part for part in created}
+        parts.update((pk, part) for pk, part in changed.items() if pk in indexed)
+        fitment.rebuild(list(indexed))
+        oem.sync_parts((pk, part.oem_number) for pk, part in parts.items())
+        part_ids = list(indexed)
+        transaction.on_commit(lambda: search.index_parts(part_ids))
+        transaction.on_commit(lambda: typeahead.index_parts(part_ids))
+
+
+def import_parts(trader, rows, delta=False, user=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Shortcut for ``PartImporter(...).run(rows)``.
+    """
+    return PartImporter(trader, delta, user, batch_size).run(rows)
@@ -0,0 +1,185 @@
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from . import category_counts, typeahead
+from .models import RESTOCK, SALE, InventoryLog, Part
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a deduction exceeds the stock on hand. ``shortages`` maps
+    each short part id to a (requested, available) pair; available is None
+    for parts that do not exist.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(
+            'Insufficient stock for part(s) '
+            + ', '.join(
+                f'{part_id} (requested {requested}, available {available})'
+                for part_id, (requested, available) in shortages.items()
+            )
+        )
+
+
+def available(part_id):
+    """
+    Available-to-sell units of a part (stock minus active reservations), or
+    None when the part does not exist.
+    """
+    return (
+        Part.objects.filter(pk=part_id)
+        .values_list(F('quantity') - F('reserved_quantity'), flat=True)
+        .first()
+    )
+
+
+def deduct(part_id, quantity, user=None, notes='', log_type=SALE, held=0):
+    """
+    Take ``quantity`` units of a part off the shelf with a single conditional
+    ``UPDATE ... SET quantity = quantity - n WHERE quantity - reserved >= n``,
+    so concurrent checkouts can neither lose updates, oversell nor take
+    units held by reservations. ``held`` units reserved for this sale (see
+    ``reservations.sell``) stop counting as reserved in the same UPDATE.
+    Logs the movement, raises InsufficientStock when the available stock is
+    short.
+    """
+    with transaction.atomic():
+        updated = Part.objects.filter(
+            pk=part_id, quantity__gte=F('reserved_quantity') - held + quantity
+        ).update(
+            quantity=F('quantity') - quantity,
+            reserved_quantity=F('reserved_quantity') - held,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise InsufficientStock({part_id: (quantity, available(part_id))})
+        InventoryLog.objects.create(
+            part_id=part_id,
+            quantity=-quantity,
+            log_type=log_type,
+            notes=notes,
+            created_by=user,
+        )
+
+
+def deduct_many(quantities, user=None, notes='', log_type=SALE):
+    """
+    All-or-nothing deduction of ``{part_id: quantity}``, e.g. a whole cart.
+    The rows are locked with ``select_for_update`` in id order (so two carts
+    cannot deadlock), checked, then decremented with one UPDATE.
+    """
+    quantities = {part_id: qty for part_id, qty in quantities.items() if qty}
+    if not quantities:
+        return
+    with transaction.atomic():
+        stock = dict(
+            Part.objects.select_for_update()
+            .filter(pk__in=quantities)
+            .order_by('pk')
+            .values_list('pk', F('quantity') - F('reserved_quantity'))
+        )
+        shortages = {
+            part_id: (qty, stock.get(part_id))
+            for part_id, qty in quantities.items()
+            if stock.get(part_id) is None or stock[part_id] < qty
+        }
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        Part.objects.filter(pk__in=quantities).update(
+            quantity=Case(
+                *[
+                    When(pk=part_id, then=F('quantity') - qty)
+                    for part_id, qty in quantities.items()
+                ],
+                default=F('quantity'),
+                output_field=PositiveIntegerField(),
+            ),
+            updated_at=timezone.now(),
+        )
+        InventoryLog.objects.bulk_create(
+            [
+                InventoryLog(
+                    part_id=part_id,
+                    quantity=-qty,
+                    log_type=log_type,
+                    notes=notes,
+                    created_by=user,
+                )
+                for part_id, qty in quantities.items()
+            ]
+        )
+
+
+def _selected(parts):
+    """
+    Plain queryset over the ids of ``parts``, which may carry annotations or
+    an ordering (admin changelists) that UPDATE and FOR UPDATE reject.
+    """
+    return Part.objects.filter(pk__in=parts.order_by().values('pk'))
+
+
+def restock_many(parts, quantity=None, user=None):
+    """
+    Restock every part of the ``parts`` queryset by ``quantity`` units, or
+    by its own ``reorder_quantity``, with one UPDATE and one bulk insert of
+    RESTOCK logs. Returns the number of parts restocked.
+    """
+    with transaction.atomic():
+        selected = _selected(parts)
+        if quantity is None:
+            selected = selected.filter(reorder_quantity__gt=0)
+        elif quantity <= 0:
+            return 0
+        restocked = {
+            pk: reorder_quantity if quantity is None else quantity
+            for pk, reorder_quantity in selected.select_for_update()
+            .order_by('pk')
+            .values_list('pk', 'reorder_quantity')
+        }
+        if not restocked:
+            return 0
+        added = F('reorder_quantity') if quantity is None else Value(quantity)
+        Part.objects.filter(pk__in=restocked).update(
+            quantity=F('quantity') + added, updated_at=timezone.now()
+        )
+        InventoryLog.objects.bulk_create(
+            [
+                InventoryLog(
+                    part_id=pk,
+                    quantity=units,
+                    log_type=RESTOCK,
+                    created_by=user,
+                    notes=f"Restocked {units} units",
+                )
+                for pk, units in restocked.items()
+            ]
+        )
+    return len(restocked)
+
+
+def toggle_active(parts):
+    """
+    Flip ``is_active`` of every part of the ``parts`` queryset with a single
+    ``CASE WHEN`` UPDATE, then refresh the category counts and autocomplete
+    entries the skipped save signals would have updated. Returns the number
+    of parts toggled.
+    """
+    with transaction.atomic():
+        selected = _selected(parts)
+        rows = list(selected.values_list('pk', 'category_id'))
+        if not rows:
+            return 0
+        part_ids = [pk for pk, _ in rows]
+        Part.objects.filter(pk__in=part_ids).update(
+            is_active=Case(
+                When(is_active=True, then=Value(False)), default=Value(True)
+            ),
+            updated_at=timezone.now(),
+        )
+        category_counts.recount({category_id for _, category_id in rows})
+        transaction.on_commit(lambda: typeahead.index_parts(part_ids))
+    return len(rows)
@@ -0,0 +1,58 @@
+from django.db.models import Q
+
+from . import oem
+from .models import Part
+from .serializers import PartStockSerializer
+
+SKU = 'sku'
+OEM_NUMBER = 'oem_number'
+
+
+def _unique(values):
+    return list(dict.fromkeys(value.strip() for value in values if value.strip()))
+
+
+def resolve(skus, oem_numbers):
+    """
+    Resolve SKUs and OEM numbers to parts with indexed ``IN`` queries. OEM
+    numbers are matched through the normalized cross reference index,
+    following supersessions.
+
+    Returns ``found`` (exactly one part), ``ambiguous`` (an OEM number shared
+    by several parts) and ``not_found`` entries, in request order.
+    """
+    skus, oem_numbers = _unique(skus), _unique(oem_numbers)
+    oem_matches = oem.find_parts(oem_numbers)
+    oem_part_ids = {part_id for ids in oem_matches.values() for part_id in ids}
+    parts = Part.objects.filter(Q(sku__in=skus) | Q(id__in=oem_part_ids)).only(
+        'sku',
+        'oem_number',
+        'name',
+        'price',
+        'quantity',
+        'reserved_quantity',
+        'low_stock_threshold',
+        'is_active',
+    )
+    parts_by_id = {part.id: part for part in parts}
+    parts_by_sku = {part.sku: part for part in parts_by_id.values()}
+
+    matches = {(SKU, sku): [parts_by_sku[sku]] for sku in skus if sku in parts_by_sku}
+    for number, part_ids in oem_matches.items():
+        matches[OEM_NUMBER, number] = [parts_by_id[part_id] for part_id in part_ids]
+
+    result = {'found': [], 'ambiguous': [], 'not_found': []}
+    queries = [(SKU, sku) for sku in skus]
+    queries += [(OEM_NUMBER, oem_number) for oem_number in oem_numbers]
+    for kind, value in queries:
+        entry = {'type': kind, 'query': value}
+        found = matches.get((kind, value), [])
+        if not found:
+            result['not_found'].append(entry)
+        elif len(found) == 1:
+            entry['part'] = PartStockSerializer(found[0]).data
+            result['found'].append(entry)
+        else:
+            entry['parts'] = PartStockSerializer(found, many=True).data
+            result['ambiguous'].append(entry)
+    return result
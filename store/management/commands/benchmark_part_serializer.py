@@ -0,0 +1,51 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from ...models import Part
+from ...readers import PartReader
+from ...serializers import PartSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare PartSerializer and PartReader throughput on catalog pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        queryset = Part.objects.order_by('id')[:rows]
+        if not queryset.exists():
+            raise CommandError('No parts to benchmark, seed the catalog first')
+
+        candidates = {
+            'PartSerializer': lambda: PartSerializer(queryset, many=True).data,
+            'PartSerializer + prefetch': lambda: PartSerializer(
+                queryset.prefetch_related('images'), many=True
+            ).data,
+            'PartReader': lambda: PartReader().read(queryset),
+        }
+
+        renderer = JSONRenderer()
+        outputs = {name: renderer.render(read()) for name, read in candidates.items()}
+        if len(set(outputs.values())) != 1:
+            raise CommandError('PartReader output differs from PartSerializer')
+
+        for name, read in candidates.items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                count = len(read())
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{name:<28} {count * repeat / elapsed:>12,.0f} rows/sec "
+                f"({elapsed / repeat * 1000:.2f} ms/page)"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Outputs identical ({len(json.loads(outputs['PartReader']))} rows)"
+            )
+        )
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.utils.response import APIResponse
+
+from ...models import Part
+from ...serializers import PartSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare the JSON, orjson and MessagePack renderers on part pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per page')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        queryset = Part.objects.prefetch_related('images').order_by('id')[:rows]
+        if not queryset.exists():
+            raise CommandError('No parts to benchmark, seed the catalog first')
+
+        # The same envelope the API sends: APIResponse around a page
+        payload = APIResponse(
+            data={
+                'count': rows,
+                'results': PartSerializer(queryset, many=True).data,
+            }
+        ).data
+        renderers = {
+            'JSONRenderer': JSONRenderer(),
+            'ORJSONRenderer': ORJSONRenderer(),
+            'MessagePackRenderer': MessagePackRenderer(),
+        }
+
+        baseline = None
+        for name, renderer in renderers.items():
+            body = renderer.render(payload)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                renderer.render(payload)
+            elapsed = (time.perf_counter() - started) / repeat
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f"{name:<20} {elapsed * 1000:>8.3f} ms/page "
+                f"{baseline / elapsed:>6.1f}x {len(body):>10,} bytes"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rows} rows x {repeat}"))
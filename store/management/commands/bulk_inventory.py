@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from ... import inventory
+from ...models import Part
+
+
+class Command(BaseCommand):
+    help = 'Restock or toggle the active status of many parts at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('operation', choices=['restock', 'toggle-active'])
+        parser.add_argument(
+            '--sku', action='append', dest='skus', help='Part SKU (can be repeated)'
+        )
+        parser.add_argument('--trader', type=int, help='Only parts of this trader')
+        parser.add_argument(
+            '--low-stock',
+            action='store_true',
+            help='Only parts at or below their low stock threshold',
+        )
+        parser.add_argument(
+            '--quantity',
+            type=int,
+            help='Units to restock (default: each part\'s reorder quantity)',
+        )
+
+    def handle(self, *args, **options):
+        parts = Part.objects.all()
+        if options['skus']:
+            parts = parts.filter(sku__in=options['skus'])
+        if options['trader']:
+            parts = parts.filter(trader_id=options['trader'])
+        if options['low_stock']:
+            parts = parts.filter(
+                quantity__lte=F('low_stock_threshold') + F('reserved_quantity')
+            )
+        if not (options['skus'] or options['trader'] or options['low_stock']):
+            raise CommandError('Select parts with --sku, --trader or --low-stock')
+
+        if options['operation'] == 'restock':
+            if options['quantity'] is not None and options['quantity'] <= 0:
+                raise CommandError('--quantity must be positive')
+            count = inventory.restock_many(parts, quantity=options['quantity'])
+            message = f"Restocked {count} parts"
+        else:
+            count = inventory.toggle_active(parts)
+            message = f"Toggled the active status of {count} parts"
+        self.stdout.write(self.style.SUCCESS(message))
@@ -1,19 +1,78 @@
+import csv
+import json
+import sys
+
 from django.core.management.base import BaseCommand
-from django.db.models import Q
 
-from ...models import Part
+from ... import reorder
 
 
 class Command(BaseCommand):
     help = 'Check stock levels and generate reorder recommendations'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=reorder.OUTFLOW_DAYS,
+            help='Outflow window used to estimate the daily demand',
+        )
+        parser.add_argument(
+            '--cover-days',
+            type=int,
+            default=reorder.COVER_DAYS,
+            help='Days of demand a reorder should cover above the threshold',
+        )
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--output-format', choices=['csv', 'json'], default='csv')
+        parser.add_argument(
+            '--output', help='File to write the report to (default: stdout)'
+        )
+
     def handle(self, *args, **options):
-        low_stock = Part.objects.filter(
-            Q(quantity__lte=F('low_stock_threshold')) & Q(is_active=True)
+        traders = reorder.report(
+            days=max(options['days'], 1),
+            cover_days=options['cover_days'],
+            workers=options['workers'],
         )
+        output = options['output']
+        stream = open(output, 'w', newline='') if output else sys.stdout
+        try:
+            if options['output_format'] == 'json':
+                parts = self.write_json(stream, traders)
+            else:
+                parts = self.write_csv(stream, traders)
+        finally:
+            if output:
+                stream.close()
 
-        for part in low_stock:
+        if output:
             self.stdout.write(
-                f"Low stock: {part.name} (Current: {part.quantity}, "
-                f"Threshold: {part.low_stock_threshold})"
+                self.style.SUCCESS(f"Wrote {parts} reorder suggestions to {output}")
             )
+
+    def write_csv(self, stream, traders):
+        writer = csv.writer(stream)
+        writer.writerow(reorder.COLUMNS)
+        parts = 0
+        for _, rows in traders:
+            writer.writerows(rows)
+            parts += len(rows)
+        return parts
+
+    def write_json(self, stream, traders):
+        """
+        One JSON array of traders with their parts, written trader by trader.
+        """
+        parts = 0
+        stream.write('[')
+        for position, (trader_id, rows) in enumerate(traders):
+            trader = {
+                'trader_id': trader_id,
+                'trader': rows[0][1],
+                'parts': [dict(zip(reorder.COLUMNS[2:], row[2:])) for row in rows],
+            }
+            stream.write((',\n' if position else '\n') + json.dumps(trader))
+            parts += len(rows)
+        stream.write('\n]\n')
+        return parts
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ... import rollups
+
+
+class Command(BaseCommand):
+    help = 'Fold new inventory logs into the daily rollups and archive old logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--archive-after-days',
+            type=int,
+            help='Move compacted raw logs older than this many days to the archive',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=rollups.ARCHIVE_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        retention = options['archive_after_days']
+        if retention is not None and retention < 1:
+            raise CommandError('--archive-after-days must be at least 1')
+
+        touched = rollups.compact()
+        message = f"Updated {touched} daily rollups"
+        if retention is not None:
+            archived = rollups.archive(
+                timezone.now() - timedelta(days=retention),
+                batch_size=options['batch_size'],
+            )
+            message += f", archived {archived} log rows"
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ... import reservations
+
+
+class Command(BaseCommand):
+    help = 'Release expired stock reservations in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=reservations.SWEEP_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        released = reservations.expire(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f"Released {released} expired reservations")
+        )
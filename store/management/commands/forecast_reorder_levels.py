@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import forecasting
+
+
+class Command(BaseCommand):
+    help = (
+        'Forecast daily demand per part and write back low stock thresholds '
+        'and reorder quantities'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=forecasting.HISTORY_DAYS,
+            help='Days of sales history to forecast from',
+        )
+        parser.add_argument(
+            '--method', choices=forecasting.METHODS, default=forecasting.EMA
+        )
+        parser.add_argument(
+            '--smoothing',
+            type=float,
+            default=forecasting.SMOOTHING,
+            help='Exponential smoothing factor (0-1)',
+        )
+        parser.add_argument(
+            '--lead-time-days', type=int, default=forecasting.LEAD_TIME_DAYS
+        )
+        parser.add_argument('--cover-days', type=int, default=forecasting.COVER_DAYS)
+        parser.add_argument(
+            '--service-factor',
+            type=float,
+            default=forecasting.SERVICE_FACTOR,
+            help='Safety stock z score (1.65 for a ~95%% service level)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=forecasting.CHUNK_SIZE)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compute the suggestions without writing them',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 2:
+            raise CommandError('--days must be at least 2')
+        if not 0 < options['smoothing'] <= 1:
+            raise CommandError('--smoothing must be in (0, 1]')
+        if forecasting.np is None:
+            raise CommandError(
+                'Demand forecasting requires numpy '
+                '(pip install -r requirements-ops.txt)'
+            )
+
+        parts, with_demand, changed = forecasting.run(
+            days=options['days'],
+            method=options['method'],
+            smoothing=options['smoothing'],
+            lead_time_days=options['lead_time_days'],
+            cover_days=options['cover_days'],
+            service_factor=options['service_factor'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Forecast {parts} parts, {with_demand} with sales, "
+                f"{verb} {changed}"
+            )
+        )
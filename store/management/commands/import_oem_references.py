@@ -0,0 +1,28 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from ... import oem
+
+
+class Command(BaseCommand):
+    help = (
+        'Import OEM cross references from a CSV file with sku, oem_number and '
+        'optional brand and supersedes columns'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=oem.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        with open(options['path'], newline='', encoding='utf-8-sig') as file:
+            imported, errors = oem.import_references(
+                csv.DictReader(file), batch_size=options['batch_size']
+            )
+
+        for line, message in errors:
+            self.stderr.write(f"Row {line}: {message}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {imported} references, {len(errors)} errors")
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import TraderProfile
+
+from ... import imports
+
+
+class Command(BaseCommand):
+    help = (
+        'Upsert a trader\'s parts by sku from a CSV or XLSX file, or update '
+        'only prices and stock with --delta'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--trader', required=True, help='Email of the trader owning the parts'
+        )
+        parser.add_argument(
+            '--delta',
+            action='store_true',
+            help='Only update the price and quantity of existing parts',
+        )
+        parser.add_argument('--batch-size', type=int, default=imports.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        trader = TraderProfile.objects.filter(user__email=options['trader']).first()
+        if trader is None:
+            raise CommandError(f"No trader with email {options['trader']!r}")
+
+        with open(options['path'], 'rb') as file:
+            try:
+                created, updated, errors = imports.import_parts(
+                    trader,
+                    imports.read_rows(file, options['path']),
+                    delta=options['delta'],
+                    batch_size=options['batch_size'],
+                )
+            except ValueError as error:
+                raise CommandError(str(error))
+
+        for line, message in errors:
+            self.stderr.write(f"Row {line}: {message}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} parts, updated {updated}, {len(errors)} errors"
+            )
+        )
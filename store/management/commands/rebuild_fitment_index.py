@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from ... import fitment
+from ...models import PartFitment
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the denormalized part fitment index and the car model '
+        'production year buckets'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--part',
+            type=int,
+            action='append',
+            dest='parts',
+            help='Only rebuild the given part id (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['parts']:
+            fitment.rebuild_years()
+        fitment.rebuild(options['parts'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Fitment index rebuilt ({PartFitment.objects.count()} rows)"
+            )
+        )
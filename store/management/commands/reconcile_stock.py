@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from ... import reconciliation
+
+
+class Command(BaseCommand):
+    help = 'Compare part stock with the inventory log ledger and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Write ADJUSTMENT logs so the ledger matches the stock',
+        )
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--chunk-size', type=int, default=reconciliation.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        checked = drifted = 0
+        ranges = reconciliation.reconcile(
+            fix=options['fix'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        )
+        for count, rows in ranges:
+            checked += count
+            drifted += len(rows)
+            for part_id, sku, quantity, ledger in rows:
+                self.stdout.write(
+                    f"Drift: {sku} (#{part_id}) stock {quantity}, "
+                    f"ledger {ledger}, off by {quantity - ledger:+d}"
+                )
+
+        action = 'adjusted' if options['fix'] else 'drifted'
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {checked} parts, {drifted} {action}")
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from ... import category_counts
+from ...models import CategoryPartCount
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-category part count rollup from the parts table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--category',
+            type=int,
+            action='append',
+            dest='categories',
+            help='Only recount the given category id (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        category_counts.recount(options['categories'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Category part counts rebuilt ({CategoryPartCount.objects.count()} rows)"
+            )
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from ... import search
+from ...models import Part
+
+
+class Command(BaseCommand):
+    help = 'Build missing or stale part search documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild every search document instead of only pending ones',
+        )
+        parser.add_argument('--batch-size', type=int, default=search.INDEX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            part_ids = Part.objects.order_by('id').values_list('id', flat=True)
+        else:
+            part_ids = search.pending_part_ids()
+
+        batch, indexed = [], 0
+        for part_id in part_ids.iterator(chunk_size=options['batch_size']):
+            batch.append(part_id)
+            if len(batch) >= options['batch_size']:
+                search.index_parts(batch)
+                indexed += len(batch)
+                batch = []
+        if batch:
+            search.index_parts(batch)
+            indexed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} parts"))
@@ -0,0 +1,111 @@
+# Generated by Django 4.2 on 2026-10-18 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_fitment(apps, schema_editor):
+    Compatibility = apps.get_model("store", "Compatibility")
+    PartFitment = apps.get_model("store", "PartFitment")
+    rows = Compatibility.objects.values_list(
+        "part_id", "car_model_id", "car_model__brand_id", "part__category_id"
+    )
+    batch = []
+    for part_id, car_model_id, brand_id, category_id in rows.iterator(
+        chunk_size=5000
+    ):
+        batch.append(
+            PartFitment(
+                part_id=part_id,
+                car_model_id=car_model_id,
+                brand_id=brand_id,
+                category_id=category_id,
+            )
+        )
+        if len(batch) >= 5000:
+            PartFitment.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        PartFitment.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0005_alter_order_tracking_number"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PartFitment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "brand",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="store.brand",
+                    ),
+                ),
+                (
+                    "car_model",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="store.carmodel",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="store.category",
+                    ),
+                ),
+                (
+                    "part",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fitments",
+                        to="store.part",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("part", "car_model")},
+            },
+        ),
+        migrations.AddIndex(
+            model_name="partfitment",
+            index=models.Index(
+                fields=["brand", "car_model", "category", "part"],
+                name="fitment_brand_model_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="partfitment",
+            index=models.Index(
+                fields=["brand", "category", "part"], name="fitment_brand_cat_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="partfitment",
+            index=models.Index(
+                fields=["car_model", "category", "part"], name="fitment_model_cat_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_fitment, migrations.RunPython.noop),
+    ]
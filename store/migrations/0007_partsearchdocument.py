@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-18 18:20
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL; other backends use the
+    # in-process fallback index in store.search.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS store_partsearchdocument_vector_gin "
+        "ON store_partsearchdocument USING gin (search_vector)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS store_partsearchdocument_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0006_partfitment"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PartSearchDocument",
+            fields=[
+                (
+                    "part",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="store.part",
+                    ),
+                ),
+                ("title", models.TextField(blank=True)),
+                ("keywords", models.TextField(blank=True)),
+                ("body", models.TextField(blank=True)),
+                (
+                    "search_vector",
+                    django.contrib.postgres.search.SearchVectorField(
+                        editable=False, null=True
+                    ),
+                ),
+                ("stale", models.BooleanField(db_index=True, default=False)),
+                ("indexed_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
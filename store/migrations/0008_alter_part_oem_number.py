@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0007_partsearchdocument"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="part",
+            name="oem_number",
+            field=models.CharField(blank=True, db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.2 on 2026-10-18 18:12
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_references(apps, schema_editor):
+    Part = apps.get_model("store", "Part")
+    OEMReference = apps.get_model("store", "OEMReference")
+    batch = []
+    parts = Part.objects.exclude(oem_number="").values_list("id", "oem_number")
+    for part_id, oem_number in parts.iterator(chunk_size=5000):
+        numbers = {}
+        for raw in re.split(r"[,;|/\n]", oem_number):
+            number = re.sub(r"[^0-9A-Z]", "", raw.upper())
+            if number:
+                numbers.setdefault(number, raw.strip())
+        batch.extend(
+            OEMReference(part_id=part_id, number=number, raw_number=raw, source="PART")
+            for number, raw in numbers.items()
+        )
+        if len(batch) >= 5000:
+            OEMReference.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        OEMReference.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0008_alter_part_oem_number"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OEMSupersession",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.CharField(max_length=255, unique=True)),
+                ("superseded_by", models.CharField(db_index=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "brand",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="store.brand",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="OEMReference",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.CharField(db_index=True, max_length=255)),
+                ("raw_number", models.CharField(max_length=255)),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("PART", "Part OEM number"),
+                            ("IMPORT", "Bulk import"),
+                        ],
+                        default="PART",
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "brand",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="store.brand",
+                    ),
+                ),
+                (
+                    "part",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="oem_references",
+                        to="store.part",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("part", "number")},
+            },
+        ),
+        migrations.RunPython(backfill_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2 on 2026-10-18 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_years(apps, schema_editor):
+    CarModel = apps.get_model("store", "CarModel")
+    CarModelYear = apps.get_model("store", "CarModelYear")
+    rows = CarModel.objects.filter(production_end__isnull=False).values_list(
+        "id", "brand_id", "production_start", "production_end"
+    )
+    CarModelYear.objects.bulk_create(
+        [
+            CarModelYear(car_model_id=car_model_id, brand_id=brand_id, year=year)
+            for car_model_id, brand_id, start, end in rows
+            for year in range(start, end + 1)
+        ],
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0009_oemsupersession_oemreference"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="carmodel",
+            index=models.Index(
+                condition=models.Q(("production_end__isnull", True)),
+                fields=["production_start"],
+                name="carmodel_in_production_idx",
+            ),
+        ),
+        migrations.CreateModel(
+            name="CarModelYear",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveIntegerField()),
+                (
+                    "brand",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="store.brand",
+                    ),
+                ),
+                (
+                    "car_model",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="years",
+                        to="store.carmodel",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("car_model", "year")},
+            },
+        ),
+        migrations.AddIndex(
+            model_name="carmodelyear",
+            index=models.Index(
+                fields=["year", "brand", "car_model"], name="carmodelyear_year_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_years, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 19:30
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # pg_trgm only exists on PostgreSQL; other backends use the trigram
+    # postings of the in-process fallback index in store.search.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS store_partsearchdocument_title_trgm "
+        "ON store_partsearchdocument USING gin (title gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS store_partsearchdocument_title_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0010_carmodelyear"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2 on 2026-10-18 19:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counts(apps, schema_editor):
+    Part = apps.get_model("store", "Part")
+    CategoryPartCount = apps.get_model("store", "CategoryPartCount")
+    counts = (
+        Part.objects.order_by()
+        .values("category_parent_id", "category_id")
+        .annotate(
+            total=Count("id"),
+            active=Count("id", filter=Q(is_active=True, approved=True)),
+        )
+    )
+    CategoryPartCount.objects.bulk_create(
+        [CategoryPartCount(**row) for row in counts], batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0011_partsearchdocument_title_trgm"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryPartCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("total", models.IntegerField(default=0)),
+                ("active", models.IntegerField(default=0)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="store.category",
+                    ),
+                ),
+                (
+                    "category_parent",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="store.categoryparent",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("category_parent", "category")},
+            },
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0012_categorypartcount"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PartTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("part_id", models.BigIntegerField()),
+                ("sku", models.CharField(max_length=50)),
+                ("removed_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="part",
+            index=models.Index(fields=["updated_at", "id"], name="part_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="parttombstone",
+            index=models.Index(
+                fields=["removed_at", "part_id"], name="tombstone_removed_idx"
+            ),
+        ),
+    ]
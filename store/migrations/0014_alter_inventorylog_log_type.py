@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0013_parttombstone"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="inventorylog",
+            name="log_type",
+            field=models.CharField(
+                choices=[
+                    ("NEW", "New Stock"),
+                    ("RESTOCK", "Restock"),
+                    ("ADJUSTMENT", "Adjustment"),
+                    ("SALE", "Sale"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
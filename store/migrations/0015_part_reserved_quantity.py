@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-18 21:00
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def backfill_reserved(apps, schema_editor):
+    Part = apps.get_model("store", "Part")
+    StockReservation = apps.get_model("store", "StockReservation")
+    held = (
+        StockReservation.objects.filter(expires_at__gt=timezone.now())
+        .values("part_id")
+        .annotate(total=Sum("quantity"))
+    )
+    for row in held:
+        Part.objects.filter(pk=row["part_id"]).update(reserved_quantity=row["total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0014_alter_inventorylog_log_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="part",
+            name="reserved_quantity",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="stockreservation",
+            index=models.Index(fields=["expires_at"], name="reservation_expires_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="stockreservation",
+            index=models.Index(fields=["session_key"], name="reservation_session_idx"),
+        ),
+        migrations.RunPython(backfill_reserved, migrations.RunPython.noop),
+    ]
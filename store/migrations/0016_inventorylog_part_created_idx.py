@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0015_part_reserved_quantity"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inventorylog",
+            index=models.Index(
+                fields=["part", "created_at"], name="inventorylog_part_created_idx"
+            ),
+        ),
+    ]
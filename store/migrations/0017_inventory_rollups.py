@@ -0,0 +1,87 @@
+# Generated by Django 4.2 on 2026-10-18 22:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0016_inventorylog_part_created_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="inventorylog",
+            index=models.Index(fields=["created_at"], name="inventorylog_created_idx"),
+        ),
+        migrations.CreateModel(
+            name="InventoryLogArchive",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("part_id", models.BigIntegerField(db_index=True)),
+                ("quantity", models.IntegerField()),
+                (
+                    "log_type",
+                    models.CharField(
+                        choices=[
+                            ("NEW", "New Stock"),
+                            ("RESTOCK", "Restock"),
+                            ("ADJUSTMENT", "Adjustment"),
+                            ("SALE", "Sale"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("notes", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField()),
+                ("created_by_id", models.UUIDField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="InventoryDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("inflow", models.PositiveIntegerField(default=0)),
+                ("outflow", models.PositiveIntegerField(default=0)),
+                ("adjustments", models.IntegerField(default=0)),
+                ("movements", models.PositiveIntegerField(default=0)),
+                ("closing_balance", models.IntegerField(default=0)),
+                (
+                    "part",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups",
+                        to="store.part",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["day"], name="rollup_day_idx")],
+                "unique_together": {("part", "day")},
+            },
+        ),
+        migrations.CreateModel(
+            name="InventoryRollupWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("compacted_until", models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2 on 2026-10-18 23:05
+
+import re
+
+from django.db import migrations, models
+
+
+def reclassify_manual(apps, schema_editor):
+    """
+    PART references not derived from their part's ``oem_number`` were added
+    in the admin, which used to default them to PART.
+    """
+    OEMReference = apps.get_model("store", "OEMReference")
+    manual = []
+    references = OEMReference.objects.filter(source="PART").values_list(
+        "id", "number", "part__oem_number"
+    )
+    for pk, number, oem_number in references.iterator(chunk_size=5000):
+        numbers = {
+            re.sub(r"[^0-9A-Z]", "", raw.upper())
+            for raw in re.split(r"[,;|/\n]", oem_number)
+        }
+        if number not in numbers:
+            manual.append(pk)
+    for start in range(0, len(manual), 5000):
+        end = start + 5000
+        OEMReference.objects.filter(id__in=manual[start:end]).update(source="MANUAL")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0017_inventory_rollups"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="oemreference",
+            name="source",
+            field=models.CharField(
+                choices=[
+                    ("PART", "Part OEM number"),
+                    ("IMPORT", "Bulk import"),
+                    ("MANUAL", "Added manually"),
+                ],
+                default="MANUAL",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(reclassify_manual, migrations.RunPython.noop),
+    ]
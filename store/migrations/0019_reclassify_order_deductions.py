@@ -0,0 +1,54 @@
+# Generated by Django 4.2 on 2026-10-18 23:20
+
+from django.db import migrations
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+
+# OrderItem.save() logged its stock deductions as adjustments before SALE
+ORDER_DEDUCTION = r"^Order .+ deduction$"
+
+
+def reclassify_order_deductions(apps, schema_editor):
+    InventoryLog = apps.get_model("store", "InventoryLog")
+    InventoryLogArchive = apps.get_model("store", "InventoryLogArchive")
+    InventoryDailyRollup = apps.get_model("store", "InventoryDailyRollup")
+    InventoryRollupWatermark = apps.get_model("store", "InventoryRollupWatermark")
+
+    logs = InventoryLog.objects.filter(
+        log_type="ADJUSTMENT", notes__regex=ORDER_DEDUCTION
+    )
+    archived = InventoryLogArchive.objects.filter(
+        log_type="ADJUSTMENT", notes__regex=ORDER_DEDUCTION
+    )
+    watermark = (
+        InventoryRollupWatermark.objects.filter(pk=1)
+        .values_list("compacted_until", flat=True)
+        .first()
+    )
+    if watermark is not None:
+        # Compacted days counted these deductions as adjustments
+        for compacted in (logs.filter(created_at__lt=watermark), archived):
+            rows = (
+                compacted.annotate(day=TruncDate("created_at"))
+                .order_by()
+                .values("part_id", "day")
+                .annotate(total=Sum("quantity"))
+                .values_list("part_id", "day", "total")
+            )
+            for part_id, day, total in rows:
+                InventoryDailyRollup.objects.filter(part_id=part_id, day=day).update(
+                    adjustments=F("adjustments") - total,
+                    outflow=F("outflow") - total,
+                )
+    logs.update(log_type="SALE")
+    archived.update(log_type="SALE")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0018_oemreference_manual_source"),
+    ]
+
+    operations = [
+        migrations.RunPython(reclassify_order_deductions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 23:40
+
+from django.db import migrations
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def resync_reserved(apps, schema_editor):
+    """
+    0015 only counted unexpired reservations, so releasing the expired rows
+    it skipped fails the reserved_quantity >= 0 check. Drop the expired rows
+    and recount the rest.
+    """
+    Part = apps.get_model("store", "Part")
+    StockReservation = apps.get_model("store", "StockReservation")
+    StockReservation.objects.filter(expires_at__lte=timezone.now()).delete()
+    Part.objects.filter(reserved_quantity__gt=0).update(reserved_quantity=0)
+    held = StockReservation.objects.values("part_id").annotate(total=Sum("quantity"))
+    for row in held:
+        Part.objects.filter(pk=row["part_id"]).update(reserved_quantity=row["total"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0019_reclassify_order_deductions"),
+    ]
+
+    operations = [
+        migrations.RunPython(resync_reserved, migrations.RunPython.noop),
+    ]
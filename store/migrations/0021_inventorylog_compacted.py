@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+def mark_compacted(apps, schema_editor):
+    """
+    Logs created before the old time watermark are in the rollups.
+    """
+    InventoryLog = apps.get_model("store", "InventoryLog")
+    InventoryRollupWatermark = apps.get_model("store", "InventoryRollupWatermark")
+    compacted_at = (
+        InventoryRollupWatermark.objects.filter(pk=1)
+        .values_list("compacted_at", flat=True)
+        .first()
+    )
+    if compacted_at is not None:
+        InventoryLog.objects.filter(created_at__lt=compacted_at).update(compacted=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0020_resync_reserved_quantity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="inventorylog",
+            name="compacted",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="inventorylog",
+            index=models.Index(
+                condition=models.Q(("compacted", False)),
+                fields=["id"],
+                name="inventorylog_pending_idx",
+            ),
+        ),
+        migrations.RenameField(
+            model_name="inventoryrollupwatermark",
+            old_name="compacted_until",
+            new_name="compacted_at",
+        ),
+        migrations.RunPython(mark_compacted, migrations.RunPython.noop),
+    ]
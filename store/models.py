@@ -1,7 +1,8 @@
 import uuid
 
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.forms import ValidationError
 from django.utils.text import slugify
 
@@ -11,10 +12,12 @@ User = get_user_model()
 NEW = 'NEW'
 RESTOCK = 'RESTOCK'
 ADJUSTMENT = 'ADJUSTMENT'
+SALE = 'SALE'
 TYPE_CHOICES = [
     (NEW, 'New Stock'),
     (RESTOCK, 'Restock'),
     (ADJUSTMENT, 'Adjustment'),
+    (SALE, 'Sale'),
 ]
 
 STATUS_CHOICES = [
@@ -93,10 +96,47 @@ class CarModel(models.Model):
     production_start = models.PositiveIntegerField()
     production_end = models.PositiveIntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Models still in production, see store.fitment.built_in
+            models.Index(
+                fields=['production_start'],
+                condition=models.Q(production_end__isnull=True),
+                name='carmodel_in_production_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.brand.name} {self.name} ({self.production_start}-{self.production_end or 'present'})"
 
 
+class CarModelYear(models.Model):
+    """
+    One row per production year of a car model whose production has ended,
+    so "models built in year X" is an index lookup instead of an interval
+    scan. Kept in sync by ``store.signals``.
+    """
+
+    car_model = models.ForeignKey(
+        CarModel, on_delete=models.CASCADE, related_name='years'
+    )
+    brand = models.ForeignKey(
+        Brand, on_delete=models.CASCADE, related_name='+', db_index=False
+    )
+    year = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('car_model', 'year')
+        indexes = [
+            models.Index(
+                fields=['year', 'brand', 'car_model'], name='carmodelyear_year_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.car_model_id} ({self.year})"
+
+
 class Part(models.Model):
     trader = models.ForeignKey(
         TraderProfile, on_delete=models.CASCADE, related_name='parts'
@@ -112,6 +152,8 @@ class Part(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     sku = models.CharField(max_length=50, unique=True)
     quantity = models.PositiveIntegerField(default=0)
+    # Units held by active StockReservations, maintained by store.reservations
+    reserved_quantity = models.PositiveIntegerField(default=0)
     compatible_models = models.ManyToManyField(CarModel, through='Compatibility')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -119,10 +161,20 @@ class Part(models.Model):
     reorder_quantity = models.PositiveIntegerField(default=10)
     is_active = models.BooleanField(default=True)
     approved = models.BooleanField(default=False)  # Admin approval
-    oem_number = models.CharField(max_length=255, blank=True)
+    oem_number = models.CharField(max_length=255, blank=True, db_index=True)
     warranty_months = models.PositiveIntegerField(default=12)
     is_featured = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Delta feed cursor, see store.changes
+            models.Index(fields=['updated_at', 'id'], name='part_updated_idx'),
+        ]
+
+    @property
+    def available_quantity(self):
+        return max(self.quantity - self.reserved_quantity, 0)
+
     @property
     def stock_status(self):
         if self.quantity == 0:
@@ -158,6 +210,165 @@ class Compatibility(models.Model):
         return f"{self.part.name} compatible with {self.car_model}"
 
 
+class PartFitment(models.Model):
+    """
+    Denormalized vehicle fitment index, kept in sync by ``store.signals``.
+    One row per compatible car model of a part, so the catalog brand/model
+    filters are a single index range scan instead of a join plus DISTINCT.
+    """
+
+    brand = models.ForeignKey(
+        Brand, on_delete=models.CASCADE, related_name='+', db_index=False
+    )
+    car_model = models.ForeignKey(
+        CarModel, on_delete=models.CASCADE, related_name='+', db_index=False
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name='+', db_index=False
+    )
+    part = models.ForeignKey(Part, on_delete=models.CASCADE, related_name='fitments')
+
+    class Meta:
+        unique_together = ('part', 'car_model')
+        indexes = [
+            models.Index(
+                fields=['brand', 'car_model', 'category', 'part'],
+                name='fitment_brand_model_idx',
+            ),
+            models.Index(
+                fields=['brand', 'category', 'part'], name='fitment_brand_cat_idx'
+            ),
+            models.Index(
+                fields=['car_model', 'category', 'part'], name='fitment_model_cat_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.part_id} fits {self.car_model_id}"
+
+
+class CategoryPartCount(models.Model):
+    """
+    Part counts per (category parent, category) pair, maintained
+    incrementally by ``store.signals`` so category menus and admin lists
+    never COUNT parts at request time. ``active`` counts parts that are
+    both active and approved.
+    """
+
+    category_parent = models.ForeignKey(
+        CategoryParent, on_delete=models.CASCADE, related_name='+'
+    )
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    total = models.IntegerField(default=0)
+    active = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('category_parent', 'category')
+
+    def __str__(self):
+        return f"{self.category_id}: {self.active}/{self.total}"
+
+
+class PartTombstone(models.Model):
+    """
+    Deleted parts, so the delta feed can tell clients to drop them. Part ids
+    are kept as plain integers since the part rows are gone.
+    """
+
+    part_id = models.BigIntegerField()
+    sku = models.CharField(max_length=50)
+    removed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['removed_at', 'part_id'], name='tombstone_removed_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} removed {self.removed_at}"
+
+
+class PartSearchDocument(models.Model):
+    """
+    Search document maintained per part by ``store.search``. On PostgreSQL the
+    ``search_vector`` column carries a GIN index (see migration 0007).
+    """
+
+    part = models.OneToOneField(
+        Part,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+    )
+    title = models.TextField(blank=True)  # name, SKU and OEM number
+    keywords = models.TextField(blank=True)  # category, brand and model names
+    body = models.TextField(blank=True)  # description
+    search_vector = SearchVectorField(null=True, editable=False)
+    stale = models.BooleanField(default=False, db_index=True)
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search document for part {self.part_id}"
+
+
+class OEMReference(models.Model):
+    """
+    Part <-> OEM number cross reference. ``number`` is normalized by
+    ``store.oem.normalize`` so lookups are exact index matches.
+    """
+
+    PART = 'PART'
+    IMPORT = 'IMPORT'
+    MANUAL = 'MANUAL'
+    SOURCE_CHOICES = [
+        (PART, 'Part OEM number'),
+        (IMPORT, 'Bulk import'),
+        (MANUAL, 'Added manually'),
+    ]
+
+    part = models.ForeignKey(
+        Part, on_delete=models.CASCADE, related_name='oem_references'
+    )
+    number = models.CharField(max_length=255, db_index=True)
+    raw_number = models.CharField(max_length=255)
+    brand = models.ForeignKey(
+        Brand, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    # Only PART rows are rewritten from ``Part.oem_number``
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default=MANUAL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('part', 'number')
+
+    def __str__(self):
+        return f"{self.raw_number} -> {self.part_id}"
+
+    def save(self, *args, **kwargs):
+        from .oem import normalize
+
+        self.number = normalize(self.raw_number)
+        super().save(*args, **kwargs)
+
+
+class OEMSupersession(models.Model):
+    """
+    ``number`` has been replaced by ``superseded_by`` (both normalized).
+    """
+
+    number = models.CharField(max_length=255, unique=True)
+    superseded_by = models.CharField(max_length=255, db_index=True)
+    brand = models.ForeignKey(
+        Brand, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.number} superseded by {self.superseded_by}"
+
+
 class PartImage(models.Model):
     part = models.ForeignKey(Part, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='part_images/')
@@ -176,6 +387,76 @@ class InventoryLog(models.Model):
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # Folded into the daily rollups by ``store.rollups.compact``
+    compacted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Recent movements of a part (reorder report)
+            models.Index(
+                fields=['part', 'created_at'], name='inventorylog_part_created_idx'
+            ),
+            # Archiving walks the log in time order
+            models.Index(fields=['created_at'], name='inventorylog_created_idx'),
+            # Logs still to be compacted
+            models.Index(
+                fields=['id'],
+                condition=models.Q(compacted=False),
+                name='inventorylog_pending_idx',
+            ),
+        ]
+
+
+class InventoryLogArchive(models.Model):
+    """
+    Raw inventory log rows moved out of ``InventoryLog`` once they are
+    compacted into daily rollups and older than the retention window. Part
+    and user ids are plain columns (no foreign keys) so archived rows
+    outlive their parts and users.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    part_id = models.BigIntegerField(db_index=True)
+    quantity = models.IntegerField()
+    log_type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    created_by_id = models.UUIDField(null=True)
+
+
+class InventoryDailyRollup(models.Model):
+    """
+    Stock movements of a part over one day, compacted from ``InventoryLog``
+    by ``store.rollups.compact``. ``closing_balance`` is the running sum of
+    every logged movement up to the end of the day.
+    """
+
+    part = models.ForeignKey(Part, on_delete=models.CASCADE, related_name='rollups')
+    day = models.DateField()
+    inflow = models.PositiveIntegerField(default=0)
+    outflow = models.PositiveIntegerField(default=0)
+    adjustments = models.IntegerField(default=0)
+    movements = models.PositiveIntegerField(default=0)
+    closing_balance = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('part', 'day')
+        indexes = [
+            models.Index(fields=['day'], name='rollup_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.part} {self.day}"
+
+
+class InventoryRollupWatermark(models.Model):
+    """
+    Single row, locked by compaction. ``compacted_at`` moves with every
+    compaction batch, so readers combining rollups with uncompacted logs can
+    tell that a batch committed in between.
+    """
+
+    compacted_at = models.DateTimeField(null=True)
 
 
 class Order(models.Model):
@@ -211,18 +492,33 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
-    def save(self, *args, **kwargs):
-        if not self.pk:  # Only on creation
-            self.part.quantity -= self.quantity
-            self.part.save()
-            InventoryLog.objects.create(
-                part=self.part,
-                quantity=-self.quantity,
-                log_type=ADJUSTMENT,
-                notes=f"Order {self.order.id} deduction",
-                created_by=self.order.user,
-            )
-        super().save(*args, **kwargs)
+    def save(self, *args, session_key=None, **kwargs):
+        """
+        Deduct the stock on creation. Pass the customer's ``session_key`` to
+        turn the units reserved for it into the sale.
+        """
+        from .inventory import deduct
+        from .reservations import sell
+
+        with transaction.atomic():
+            if not self.pk:  # Only on creation
+                notes = f"Order {self.order_id} deduction"
+                if session_key:
+                    sell(
+                        self.part_id,
+                        self.quantity,
+                        session_key,
+                        user=self.order.user,
+                        notes=notes,
+                    )
+                else:
+                    deduct(
+                        self.part_id,
+                        self.quantity,
+                        user=self.order.user,
+                        notes=notes,
+                    )
+            super().save(*args, **kwargs)
 
 
 class StockReservation(models.Model):
@@ -232,6 +528,12 @@ class StockReservation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+            models.Index(fields=['session_key'], name='reservation_session_idx'),
+        ]
+
     def __str__(self):
         return f"Reservation for {self.part.name} ({self.quantity})"
 
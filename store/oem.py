@@ -0,0 +1,189 @@
+import re
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .models import Brand, OEMReference, OEMSupersession, Part
+
+NON_ALNUM_RE = re.compile(r'[^0-9A-Z]')
+SEPARATORS_RE = re.compile(r'[,;|/\n]')
+MAX_SUPERSESSION_DEPTH = 10
+IMPORT_BATCH_SIZE = 1000
+
+
+def normalize(number):
+    """
+    "34 11-6.000 a" -> "341160000A"
+    """
+    return NON_ALNUM_RE.sub('', number.upper())
+
+
+def split_numbers(value):
+    """
+    Normalized -> raw OEM numbers of a free text ``Part.oem_number``, which may
+    list several numbers separated by commas, semicolons or slashes.
+    """
+    numbers = {}
+    for raw in SEPARATORS_RE.split(value or ''):
+        number = normalize(raw)
+        if number:
+            numbers.setdefault(number, raw.strip())
+    return numbers
+
+
+def sync_parts(parts):
+    """
+    Make the PART sourced references of ``parts`` ((id, oem_number) pairs)
+    match their current ``oem_number``.
+    """
+    wanted = {part_id: split_numbers(oem_number) for part_id, oem_number in parts}
+    existing = defaultdict(set)
+    references = OEMReference.objects.filter(
+        part_id__in=wanted, source=OEMReference.PART
+    )
+    for part_id, number in references.values_list('part_id', 'number'):
+        existing[part_id].add(number)
+
+    obsolete, created = [], []
+    for part_id, numbers in wanted.items():
+        obsolete.extend(
+            (part_id, number) for number in existing[part_id] - set(numbers)
+        )
+        created.extend(
+            OEMReference(
+                part_id=part_id,
+                number=number,
+                raw_number=raw,
+                source=OEMReference.PART,
+            )
+            for number, raw in numbers.items()
+            if number not in existing[part_id]
+        )
+
+    if obsolete:
+        stale = Q()
+        for part_id, number in obsolete:
+            stale |= Q(part_id=part_id, number=number)
+        references.filter(stale).delete()
+    OEMReference.objects.bulk_create(created, ignore_conflicts=True)
+
+
+def sync_part(part):
+    sync_parts([(part.pk, part.oem_number)])
+
+
+def supersession_chains(numbers):
+    """
+    Map each normalized number to its supersession chain, oldest first:
+    ``{"A": ["A", "B", "C"]}`` when A was superseded by B and B by C. Costs
+    one indexed query per chain level.
+    """
+    chains = {number: [number] for number in numbers}
+    pending = set(chains)
+    for _ in range(MAX_SUPERSESSION_DEPTH):
+        tails = {chains[origin][-1] for origin in pending}
+        if not tails:
+            break
+        newer = dict(
+            OEMSupersession.objects.filter(number__in=tails).values_list(
+                'number', 'superseded_by'
+            )
+        )
+        for origin in list(pending):
+            chain = chains[origin]
+            successor = newer.get(chain[-1])
+            if successor is None or successor in chain:
+                pending.discard(origin)
+            else:
+                chain.append(successor)
+    return chains
+
+
+def find_parts(numbers):
+    """
+    Map each raw OEM number to the ids of the parts referencing it, or any
+    number that supersedes it.
+    """
+    normalized = {raw: normalize(raw) for raw in numbers}
+    chains = supersession_chains(set(normalized.values()) - {''})
+    candidates = {number for chain in chains.values() for number in chain}
+
+    parts_by_number = defaultdict(set)
+    references = OEMReference.objects.filter(number__in=candidates)
+    for number, part_id in references.values_list('number', 'part_id'):
+        parts_by_number[number].add(part_id)
+
+    result = {}
+    for raw, number in normalized.items():
+        part_ids = set()
+        for chain_number in chains.get(number, []):
+            part_ids |= parts_by_number[chain_number]
+        result[raw] = sorted(part_ids)
+    return result
+
+
+def filter_parts(queryset, number):
+    chain = supersession_chains({normalize(number)}).get(normalize(number), [])
+    references = OEMReference.objects.filter(number__in=chain)
+    return queryset.filter(id__in=references.values('part_id'))
+
+
+def import_references(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import cross references from dict rows with ``sku``, ``oem_number`` and
+    optional ``brand`` (name) and ``supersedes`` (an older OEM number that
+    ``oem_number`` replaces). Returns (imported, errors) where errors are
+    (row number, message) pairs.
+    """
+    brands = dict(Brand.objects.values_list('name', 'id'))
+    imported, errors, batch = 0, [], []
+
+    def flush():
+        nonlocal imported
+        part_ids = dict(
+            Part.objects.filter(
+                sku__in={row.get('sku') for _, row in batch}
+            ).values_list('sku', 'id')
+        )
+        references, supersessions = [], {}
+        for line, row in batch:
+            sku, raw_number = row.get('sku'), row.get('oem_number') or ''
+            number = normalize(raw_number)
+            brand_id = brands.get(row.get('brand') or '')
+            if sku not in part_ids:
+                errors.append((line, f"Unknown sku {sku!r}"))
+                continue
+            if not number:
+                errors.append((line, 'Missing oem_number'))
+                continue
+            references.append(
+                OEMReference(
+                    part_id=part_ids[sku],
+                    number=number,
+                    raw_number=raw_number.strip(),
+                    brand_id=brand_id,
+                    source=OEMReference.IMPORT,
+                )
+            )
+            superseded = normalize(row.get('supersedes') or '')
+            if superseded and superseded != number:
+                supersessions[superseded] = OEMSupersession(
+                    number=superseded, superseded_by=number, brand_id=brand_id
+                )
+        OEMReference.objects.bulk_create(references, ignore_conflicts=True)
+        OEMSupersession.objects.bulk_create(
+            supersessions.values(),
+            update_conflicts=True,
+            unique_fields=['number'],
+            update_fields=['superseded_by', 'brand'],
+        )
+        imported += len(references)
+        batch.clear()
+
+    for line, row in enumerate(rows, start=1):
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return imported, errors
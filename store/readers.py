@@ -0,0 +1,127 @@
+from collections import defaultdict
+
+from rest_framework import serializers
+
+from .models import PartImage
+from .serializers import PartSerializer
+
+
+class PartReader:
+    """
+    Read-only fast path for ``PartSerializer`` payloads.
+
+    Rows are fetched with ``.values()`` and the images of a whole page with a
+    single extra query, then the JSON shape is built directly, without model
+    instances or per-field serializer dispatch. The output is identical to
+    ``PartSerializer(many=True).data``.
+
+    ``fields`` / ``omit`` select a sparse fieldset: only those columns are
+    read and the image query is skipped unless ``images`` is selected.
+    ``extra_columns`` are read but not output (ordering keys, validators).
+    """
+
+    serializer_class = PartSerializer
+
+    def __init__(self, context=None, fields=None, omit=None, extra_columns=()):
+        self.context = context or {}
+        self.fields = self.select_fields(fields, omit)
+        columns = [field for field in self.fields if field != 'images']
+        self.columns = list(dict.fromkeys(['id', *columns, *extra_columns]))
+        self.converters = self.get_converters()
+
+    @classmethod
+    def from_request(cls, request, extra_columns=()):
+        """
+        Reader for the ``?fields=`` / ``?omit=`` comma separated lists of
+        ``request``.
+        """
+
+        def names(param):
+            value = request.query_params.get(param)
+            if value is None:
+                return None
+            return [name.strip() for name in value.split(',') if name.strip()]
+
+        return cls(
+            context={'request': request},
+            fields=names('fields'),
+            omit=names('omit'),
+            extra_columns=extra_columns,
+        )
+
+    def select_fields(self, fields, omit):
+        available = list(self.serializer_class.Meta.fields)
+        requested = set(fields or available)
+        omitted = set(omit or ())
+        unknown = (requested | omitted) - set(available)
+        if unknown:
+            raise serializers.ValidationError(
+                {'fields': f'Unknown fields: {", ".join(sorted(unknown))}.'}
+            )
+        selected = [
+            field for field in available if field in requested and field not in omitted
+        ]
+        if not selected:
+            raise serializers.ValidationError({'fields': 'No fields selected.'})
+        return selected
+
+    def get_converters(self):
+        # Only decimals and datetimes need formatting, every other column of a
+        # values() row is already in its JSON representation.
+        converters = {}
+        serializer = self.serializer_class(context=self.context)
+        for name, field in serializer.fields.items():
+            if name in self.fields and isinstance(
+                field, (serializers.DecimalField, serializers.DateTimeField)
+            ):
+                converters[name] = field.to_representation
+        return converters
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def image_url(self, name):
+        if not name:
+            return None
+        url = PartImage._meta.get_field('image').storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_images(self, part_ids):
+        images = defaultdict(list)
+        rows = (
+            PartImage.objects.filter(part_id__in=part_ids)
+            .order_by('id')
+            .values_list('part_id', 'id', 'image', 'caption')
+        )
+        for part_id, image_id, image, caption in rows:
+            images[part_id].append(
+                {'id': image_id, 'image': self.image_url(image), 'caption': caption}
+            )
+        return images
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        images = None
+        if 'images' in self.fields:
+            images = self.get_images([row['id'] for row in rows])
+
+        data = []
+        for row in rows:
+            item = {}
+            for field in self.fields:
+                if field == 'images':
+                    item[field] = images.get(row['id'], [])
+                    continue
+                value = row[field]
+                converter = self.converters.get(field)
+                if converter is not None and value is not None:
+                    value = converter(value)
+                item[field] = value
+            data.append(item)
+        return data
+
+    def read(self, queryset):
+        return self.to_representation(self.values(queryset))
@@ -0,0 +1,131 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from . import rollups
+from .models import Part
+
+STREAM_CHUNK_SIZE = 5000
+OUTFLOW_DAYS = 30
+COVER_DAYS = 14
+
+COLUMNS = (
+    'trader_id',
+    'trader',
+    'part_id',
+    'sku',
+    'name',
+    'quantity',
+    'reserved',
+    'available',
+    'low_stock_threshold',
+    'reorder_quantity',
+    'outflow',
+    'daily_outflow',
+    'suggested_quantity',
+)
+
+
+def low_stock_rows(chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Active parts whose available stock (quantity minus reservations) is at
+    or below their threshold, streamed in trader order.
+    """
+    parts = (
+        Part.objects.filter(
+            is_active=True,
+            quantity__lte=F('low_stock_threshold') + F('reserved_quantity'),
+        )
+        .order_by('trader_id', 'id')
+        .values_list(
+            'trader_id',
+            'trader__company_name',
+            'id',
+            'sku',
+            'name',
+            'quantity',
+            'reserved_quantity',
+            'low_stock_threshold',
+            'reorder_quantity',
+        )
+    )
+    return parts.iterator(chunk_size=chunk_size)
+
+
+def suggest(rows, since, days, cover_days):
+    """
+    Reorder suggestions for one trader's low stock rows: enough to cover
+    ``cover_days`` of the recent daily outflow on top of the threshold, and
+    never less than the part's ``reorder_quantity``.
+    """
+    try:
+        taken = rollups.outflow([row[2] for row in rows], since)
+    finally:
+        # Runs in a worker thread with its own connection
+        connection.close()
+
+    report = []
+    for (
+        trader_id,
+        trader,
+        part_id,
+        sku,
+        name,
+        quantity,
+        reserved,
+        threshold,
+        reorder_quantity,
+    ) in rows:
+        available = max(quantity - reserved, 0)
+        out = taken.get(part_id, 0)
+        daily = out / days
+        target = threshold + math.ceil(daily * cover_days)
+        report.append(
+            (
+                trader_id,
+                trader,
+                part_id,
+                sku,
+                name,
+                quantity,
+                reserved,
+                available,
+                threshold,
+                reorder_quantity,
+                out,
+                round(daily, 2),
+                max(reorder_quantity, target - available),
+            )
+        )
+    return report
+
+
+def report(days=OUTFLOW_DAYS, cover_days=COVER_DAYS, workers=4):
+    """
+    Yield (trader_id, rows) reorder reports, one trader at a time, in trader
+    order. The low stock parts are streamed once; each trader's outflow
+    lookup and suggestions run on a pool of ``workers`` threads with a
+    bounded number of traders in flight, so memory stays bounded by the
+    largest trader's low stock list times the window.
+    """
+    since = timezone.now() - timedelta(days=days)
+    window = max(workers, 1) * 2
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        pending = []
+        for trader_id, rows in groupby(low_stock_rows(), key=lambda row: row[0]):
+            pending.append(
+                (
+                    trader_id,
+                    executor.submit(suggest, list(rows), since, days, cover_days),
+                )
+            )
+            if len(pending) >= window:
+                trader_id, future = pending.pop(0)
+                yield trader_id, future.result()
+        for trader_id, future in pending:
+            yield trader_id, future.result()
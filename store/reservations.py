@@ -0,0 +1,191 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, When
+from django.utils import timezone
+
+from .inventory import InsufficientStock, available, deduct
+from .models import SALE, InventoryLog, Part, StockReservation
+
+RESERVATION_TTL = timedelta(minutes=15)
+SWEEP_BATCH_SIZE = 1000
+
+
+def _hold(part_id, quantity):
+    return Part.objects.filter(
+        pk=part_id, quantity__gte=F('reserved_quantity') + quantity
+    ).update(reserved_quantity=F('reserved_quantity') + quantity)
+
+
+def _unhold(counts):
+    """
+    Give back ``{part_id: quantity}`` reserved units with one UPDATE.
+    """
+    if not counts:
+        return
+    Part.objects.filter(pk__in=counts).update(
+        reserved_quantity=Case(
+            *[
+                When(pk=part_id, then=F('reserved_quantity') - quantity)
+                for part_id, quantity in counts.items()
+            ],
+            default=F('reserved_quantity'),
+            output_field=PositiveIntegerField(),
+        )
+    )
+
+
+def reserve(part_id, quantity, session_key, ttl=RESERVATION_TTL):
+    """
+    Hold ``quantity`` units of a part for ``session_key`` until ``ttl`` runs
+    out. The hold is a conditional increment of ``Part.reserved_quantity``,
+    so reservations never exceed the stock. When the stock looks short,
+    the expired reservations of that part are released first and the hold
+    retried once.
+    """
+    with transaction.atomic():
+        held = _hold(part_id, quantity)
+        if not held and expire(part_id=part_id):
+            held = _hold(part_id, quantity)
+        if not held:
+            raise InsufficientStock({part_id: (quantity, available(part_id))})
+        return StockReservation.objects.create(
+            part_id=part_id,
+            quantity=quantity,
+            session_key=session_key,
+            expires_at=timezone.now() + ttl,
+        )
+
+
+def _take(reservations):
+    """
+    Lock and delete ``reservations``, skipping rows another transaction is
+    already releasing. Returns the released (id, part_id, quantity) rows.
+    """
+    rows = list(
+        reservations.select_for_update(skip_locked=True).values_list(
+            'id', 'part_id', 'quantity'
+        )
+    )
+    if rows:
+        StockReservation.objects.filter(id__in=[row[0] for row in rows]).delete()
+    return rows
+
+
+def _per_part(rows):
+    counts = Counter()
+    for _, part_id, quantity in rows:
+        counts[part_id] += quantity
+    return counts
+
+
+def release(session_key):
+    """
+    Drop every reservation of ``session_key`` (abandoned cart, logout).
+    """
+    with transaction.atomic():
+        counts = _per_part(
+            _take(StockReservation.objects.filter(session_key=session_key))
+        )
+        _unhold(counts)
+    return sum(counts.values())
+
+
+def discard(reservations):
+    """
+    Drop the ``reservations`` queryset (e.g. rows picked in the admin) and
+    give their units back. Returns the number of reservations released.
+    """
+    with transaction.atomic():
+        rows = _take(reservations)
+        _unhold(_per_part(rows))
+    return len(rows)
+
+
+def sell(part_id, quantity, session_key, user=None, notes=''):
+    """
+    Sell ``quantity`` units of a part (an order line), using up what
+    ``session_key`` holds on it first so a customer can buy the units they
+    reserved. Held units beyond ``quantity`` are released. Raises
+    InsufficientStock, keeping the reservations, when the stock is short.
+    """
+    with transaction.atomic():
+        rows = _take(
+            StockReservation.objects.filter(part_id=part_id, session_key=session_key)
+        )
+        deduct(
+            part_id,
+            quantity,
+            user=user,
+            notes=notes,
+            held=sum(_per_part(rows).values()),
+        )
+
+
+def checkout(session_key, user=None, notes=''):
+    """
+    Turn the reservations of ``session_key`` into sales: stock and reserved
+    units drop together, so the units never become available in between.
+    Expired reservations that were not swept yet still count. Returns the
+    sold {part_id: quantity}, empty when nothing was reserved.
+    """
+    with transaction.atomic():
+        counts = _per_part(
+            _take(StockReservation.objects.filter(session_key=session_key))
+        )
+        if not counts:
+            return counts
+        Part.objects.filter(pk__in=counts).update(
+            **{
+                field: Case(
+                    *[
+                        When(pk=part_id, then=F(field) - quantity)
+                        for part_id, quantity in counts.items()
+                    ],
+                    default=F(field),
+                    output_field=PositiveIntegerField(),
+                )
+                for field in ('quantity', 'reserved_quantity')
+            },
+            updated_at=timezone.now(),
+        )
+        InventoryLog.objects.bulk_create(
+            [
+                InventoryLog(
+                    part_id=part_id,
+                    quantity=-quantity,
+                    log_type=SALE,
+                    notes=notes,
+                    created_by=user,
+                )
+                for part_id, quantity in counts.items()
+            ]
+        )
+    return counts
+
+
+def expire(batch_size=SWEEP_BATCH_SIZE, part_id=None):
+    """
+    Release expired reservations in batches of ``batch_size`` (one short
+    transaction per batch, walking the ``expires_at`` index). Returns the
+    number of reservations released.
+    """
+    now = timezone.now()
+    expired = StockReservation.objects.filter(expires_at__lte=now)
+    if part_id is not None:
+        expired = expired.filter(part_id=part_id)
+
+    released = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                expired.order_by('expires_at').values_list('id', flat=True)[:batch_size]
+            )
+            rows = _take(StockReservation.objects.filter(id__in=ids))
+            _unhold(_per_part(rows))
+        released += len(rows)
+        # A short batch is the tail; an empty one means the rest is locked
+        # by concurrent releases.
+        if len(ids) < batch_size or not rows:
+            return released
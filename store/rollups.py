@@ -0,0 +1,283 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import (Case, Count, F, OuterRef, Q, Subquery, Sum,
+                              Value, When)
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (ADJUSTMENT, InventoryDailyRollup, InventoryLog,
+                     InventoryLogArchive, InventoryRollupWatermark, Part)
+
+BATCH_SIZE = 1000
+COMPACT_BATCH_SIZE = 20000
+ARCHIVE_BATCH_SIZE = 5000
+
+MOVEMENT = ~Q(log_type=ADJUSTMENT)
+
+
+def watermark():
+    """
+    When the last compaction batch committed (None before the first one).
+    """
+    return (
+        InventoryRollupWatermark.objects.filter(pk=1)
+        .values_list('compacted_at', flat=True)
+        .first()
+    )
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    return start, end
+
+
+def closing_balances(part_ids, day=None):
+    """
+    Closing balance of the latest rollup (before ``day``) for each part,
+    None for parts without one.
+    """
+    latest = InventoryDailyRollup.objects.filter(part=OuterRef('pk'))
+    if day is not None:
+        latest = latest.filter(day__lt=day)
+    latest = latest.order_by('-day').values('closing_balance')[:1]
+    return dict(
+        Part.objects.filter(pk__in=part_ids).values_list('pk', Subquery(latest))
+    )
+
+
+def _compact_day(day, logs):
+    totals = (
+        logs.order_by()
+        .values('part_id')
+        .annotate(
+            inflow=Sum('quantity', filter=MOVEMENT & Q(quantity__gt=0)),
+            outflow=Sum('quantity', filter=MOVEMENT & Q(quantity__lt=0)),
+            adjustments=Sum('quantity', filter=Q(log_type=ADJUSTMENT)),
+            movements=Count('id'),
+            net=Sum('quantity'),
+        )
+    )
+    totals = {row['part_id']: row for row in totals}
+    part_ids = list(totals)
+    for start in range(0, len(part_ids), BATCH_SIZE):
+        end = start + BATCH_SIZE
+        chunk = part_ids[start:end]
+        existing = {
+            rollup.part_id: rollup
+            for rollup in InventoryDailyRollup.objects.filter(
+                part_id__in=chunk, day=day
+            )
+        }
+        missing = [part_id for part_id in chunk if part_id not in existing]
+        previous = closing_balances(missing, day) if missing else {}
+
+        created = []
+        for part_id in chunk:
+            row = totals[part_id]
+            rollup = existing.get(part_id)
+            if rollup is None:
+                rollup = InventoryDailyRollup(
+                    part_id=part_id,
+                    day=day,
+                    closing_balance=previous.get(part_id) or 0,
+                )
+                created.append(rollup)
+            rollup.inflow += row['inflow'] or 0
+            rollup.outflow -= row['outflow'] or 0
+            rollup.adjustments += row['adjustments'] or 0
+            rollup.movements += row['movements']
+            rollup.closing_balance += row['net']
+        InventoryDailyRollup.objects.bulk_update(
+            existing.values(),
+            ['inflow', 'outflow', 'adjustments', 'movements', 'closing_balance'],
+        )
+        InventoryDailyRollup.objects.bulk_create(created)
+        # Logs committed late can land before days already rolled up
+        InventoryDailyRollup.objects.filter(part_id__in=chunk, day__gt=day).update(
+            closing_balance=F('closing_balance')
+            + Case(
+                *[
+                    When(part_id=part_id, then=Value(totals[part_id]['net']))
+                    for part_id in chunk
+                ],
+                default=Value(0),
+            )
+        )
+    return len(part_ids)
+
+
+def compact(batch_size=COMPACT_BATCH_SIZE):
+    """
+    Fold the logs not compacted yet into the daily rollups, ``batch_size``
+    logs per transaction, and flag them. Logs are picked by the flag rather
+    than by time, so a row committed late (a long import transaction) is
+    folded in by the next run whatever its ``created_at``. Returns the number
+    of (part, day) rollups touched.
+    """
+    touched = 0
+    while True:
+        with transaction.atomic():
+            state, _ = (
+                InventoryRollupWatermark.objects.select_for_update().get_or_create(pk=1)
+            )
+            ids = list(
+                InventoryLog.objects.filter(compacted=False)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return touched
+            logs = InventoryLog.objects.filter(id__in=ids)
+            days = (
+                logs.annotate(day=TruncDate('created_at'))
+                .order_by('day')
+                .values_list('day', flat=True)
+                .distinct()
+            )
+            for day in list(days):
+                start, end = _day_bounds(day)
+                touched += _compact_day(
+                    day, logs.filter(created_at__gte=start, created_at__lt=end)
+                )
+            logs.update(compacted=True)
+            state.compacted_at = timezone.now()
+            state.save(update_fields=['compacted_at'])
+
+
+def ledger_balances(part_ids):
+    """
+    Sum of every logged movement per part: the latest rollup closing balance
+    plus the logs not compacted yet, one grouped query each. Returns
+    (balances, watermark) so callers can detect a compaction committing in
+    between.
+    """
+    compacted_at = watermark()
+    balances = {part_id: 0 for part_id in part_ids}
+    for part_id, balance in closing_balances(part_ids).items():
+        balances[part_id] = balance or 0
+    rows = (
+        InventoryLog.objects.filter(part_id__in=part_ids, compacted=False)
+        .order_by()
+        .values('part_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('part_id', 'total')
+    )
+    for part_id, total in rows:
+        balances[part_id] = balances.get(part_id, 0) + total
+    return balances, compacted_at
+
+
+def outflow(part_ids, since):
+    """
+    Units taken out of stock (sales, not adjustments) per part since
+    ``since``: daily rollups for the compacted logs, with ``since`` rounded
+    down to its day, plus the logs not compacted yet.
+    """
+    totals = {}
+    rows = (
+        InventoryDailyRollup.objects.filter(
+            part_id__in=part_ids, day__gte=timezone.localdate(since), outflow__gt=0
+        )
+        .values('part_id')
+        .annotate(total=Sum('outflow'))
+        .values_list('part_id', 'total')
+    )
+    totals.update(rows)
+
+    rows = (
+        InventoryLog.objects.filter(
+            MOVEMENT,
+            part_id__in=part_ids,
+            quantity__lt=0,
+            created_at__gte=since,
+            compacted=False,
+        )
+        .order_by()
+        .values('part_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('part_id', 'total')
+    )
+    for part_id, total in rows:
+        totals[part_id] = totals.get(part_id, 0) - total
+    return totals
+
+
+def daily_outflow(low, high, since):
+    """
+    (part_id, day, units) sales outflow of parts with ``low <= id <= high``
+    for every day since the ``since`` date: compacted logs from the rollups,
+    the others from the raw logs. A day can come from both.
+    """
+    yield from InventoryDailyRollup.objects.filter(
+        part_id__gte=low, part_id__lte=high, day__gte=since, outflow__gt=0
+    ).values_list('part_id', 'day', 'outflow').iterator(chunk_size=10000)
+
+    rows = (
+        InventoryLog.objects.filter(
+            MOVEMENT,
+            part_id__gte=low,
+            part_id__lte=high,
+            quantity__lt=0,
+            created_at__gte=_day_bounds(since)[0],
+            compacted=False,
+        )
+        .annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values('part_id', 'day')
+        .annotate(total=Sum('quantity'))
+        .values_list('part_id', 'day', 'total')
+    )
+    for part_id, day, total in rows:
+        yield part_id, day, -total
+
+
+def archive(before, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move compacted raw logs created before ``before`` to
+    ``InventoryLogArchive`` in batches. Returns the number of rows moved.
+    """
+    logs = InventoryLog.objects.filter(created_at__lt=before, compacted=True)
+
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                logs.order_by('created_at').values_list(
+                    'id',
+                    'part_id',
+                    'quantity',
+                    'log_type',
+                    'notes',
+                    'created_at',
+                    'created_by_id',
+                )[:batch_size]
+            )
+            if not rows:
+                return moved
+            InventoryLogArchive.objects.bulk_create(
+                [
+                    InventoryLogArchive(
+                        id=pk,
+                        part_id=part_id,
+                        quantity=quantity,
+                        log_type=log_type,
+                        notes=notes,
+                        created_at=created_at,
+                        created_by_id=created_by_id,
+                    )
+                    for (
+                        pk,
+                        part_id,
+                        quantity,
+                        log_type,
+                        notes,
+                        created_at,
+                        created_by_id,
+                    ) in rows
+                ],
+                ignore_conflicts=True,
+            )
+            InventoryLog.objects.filter(id__in=[row[0] for row in rows]).delete()
+        moved += len(rows)
@@ -0,0 +1,287 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector,
+                                            TrigramWordSimilarity)
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Value, When
+from rest_framework import filters
+
+from .models import Compatibility, Part, PartFitment, PartSearchDocument
+
+SEARCH_CONFIG = 'simple'
+INDEX_BATCH_SIZE = 1000
+TOKEN_RE = re.compile(r'\w+')
+# Same default as pg_trgm's word_similarity_threshold
+FUZZY_THRESHOLD = 0.6
+
+DOCUMENT_VECTOR = (
+    SearchVector('title', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('keywords', weight='B', config=SEARCH_CONFIG)
+    + SearchVector('body', weight='C', config=SEARCH_CONFIG)
+)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def trigrams(text):
+    """
+    pg_trgm style trigrams: every word is lowercased and padded with two
+    leading and one trailing space, "pad" -> {"  p", " pa", "pad", "ad "}.
+    """
+    grams = set()
+    for token in tokenize(text):
+        padded = f'  {token} '
+        grams.update(map(''.join, zip(padded, padded[1:], padded[2:])))
+    return grams
+
+
+def _compact(value):
+    # "34 11-6 000" and "34116000" should both match the same OEM number
+    return ''.join(tokenize(value))
+
+
+def build_documents(part_ids):
+    vehicles = defaultdict(set)
+    compatibilities = Compatibility.objects.filter(part_id__in=part_ids).values_list(
+        'part_id', 'car_model__name', 'car_model__brand__name'
+    )
+    for part_id, model_name, brand_name in compatibilities:
+        vehicles[part_id].update((brand_name, model_name))
+
+    parts = Part.objects.filter(id__in=part_ids).values_list(
+        'id',
+        'name',
+        'description',
+        'sku',
+        'oem_number',
+        'category__name',
+        'category_parent__name',
+    )
+    for part_id, name, description, sku, oem_number, category, parent in parts:
+        title = [name, sku, _compact(sku), oem_number, _compact(oem_number)]
+        keywords = [parent, category, *sorted(vehicles[part_id])]
+        yield PartSearchDocument(
+            part_id=part_id,
+            title=' '.join(filter(None, title)),
+            keywords=' '.join(filter(None, keywords)),
+            body=description,
+            stale=False,
+        )
+
+
+def index_parts(part_ids):
+    """
+    (Re)build the search documents of the given parts in batches.
+    """
+    part_ids = list(part_ids)
+    for start in range(0, len(part_ids), INDEX_BATCH_SIZE):
+        end = start + INDEX_BATCH_SIZE
+        batch = part_ids[start:end]
+        documents = list(build_documents(batch))
+        with transaction.atomic():
+            PartSearchDocument.objects.bulk_create(
+                documents,
+                update_conflicts=True,
+                unique_fields=['part'],
+                update_fields=['title', 'keywords', 'body', 'stale', 'indexed_at'],
+            )
+            if connection.vendor == 'postgresql':
+                PartSearchDocument.objects.filter(part_id__in=batch).update(
+                    search_vector=DOCUMENT_VECTOR
+                )
+
+
+def pending_part_ids():
+    """
+    Parts whose document is missing or was marked stale.
+    """
+    missing = Part.objects.filter(search_document__isnull=True).values_list(
+        'id', flat=True
+    )
+    stale = PartSearchDocument.objects.filter(stale=True).values_list(
+        'part_id', flat=True
+    )
+    return missing.union(stale)
+
+
+def mark_stale(**lookups):
+    """
+    Flag the documents of every part matching ``lookups`` for the next
+    incremental reindex, e.g. after a brand or category is renamed.
+    """
+    return PartSearchDocument.objects.filter(
+        part_id__in=Part.objects.filter(**lookups).values('id')
+    ).update(stale=True)
+
+
+def mark_vehicle_stale(**lookups):
+    return PartSearchDocument.objects.filter(
+        part_id__in=PartFitment.objects.filter(**lookups).values('part_id')
+    ).update(stale=True)
+
+
+class InMemorySearchIndex:
+    """
+    Inverted index over ``PartSearchDocument`` rows, used where the database
+    has no full-text search (SQLite test runs). Rebuilt lazily whenever the
+    document table changes.
+    """
+
+    FIELD_WEIGHTS = (4, 2, 1)  # title, keywords, body
+
+    def __init__(self):
+        self.signature = None
+        self.tokens = []
+        self.postings = {}
+        self.trigram_postings = {}
+
+    def refresh(self):
+        signature = PartSearchDocument.objects.aggregate(
+            count=Count('pk'), last=Max('indexed_at')
+        )
+        signature = (signature['count'], signature['last'])
+        if signature == self.signature:
+            return
+
+        postings = defaultdict(dict)
+        trigram_postings = defaultdict(set)
+        rows = PartSearchDocument.objects.values_list(
+            'part_id', 'title', 'keywords', 'body'
+        )
+        for part_id, *texts in rows.iterator():
+            for weight, text in zip(self.FIELD_WEIGHTS, texts):
+                for token in tokenize(text):
+                    postings[token][part_id] = postings[token].get(part_id, 0) + weight
+            for gram in trigrams(texts[0]):
+                trigram_postings[gram].add(part_id)
+        self.postings = dict(postings)
+        self.trigram_postings = dict(trigram_postings)
+        self.tokens = sorted(postings)
+        self.signature = signature
+
+    def _prefix_matches(self, term):
+        matches = defaultdict(int)
+        position = bisect_left(self.tokens, term)
+        while position < len(self.tokens) and self.tokens[position].startswith(term):
+            for part_id, weight in self.postings[self.tokens[position]].items():
+                matches[part_id] += weight
+            position += 1
+        return matches
+
+    def search(self, terms):
+        """
+        Return the ids of parts matching every term (as a prefix), best
+        match first.
+        """
+        self.refresh()
+        scores = None
+        for term in terms:
+            matches = self._prefix_matches(term)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    part_id: scores[part_id] + weight
+                    for part_id, weight in matches.items()
+                    if part_id in scores
+                }
+            if not scores:
+                return []
+        return sorted(scores, key=lambda part_id: (-scores[part_id], part_id))
+
+    def fuzzy_search(self, text, threshold=FUZZY_THRESHOLD):
+        """
+        Return the ids of parts whose title shares at least ``threshold`` of
+        the trigrams of ``text``, most similar first. Approximates pg_trgm's
+        ``word_similarity`` from the trigram postings, without a scan.
+        """
+        self.refresh()
+        grams = trigrams(text)
+        if not grams:
+            return []
+        shared = defaultdict(int)
+        for gram in grams:
+            for part_id in self.trigram_postings.get(gram, ()):
+                shared[part_id] += 1
+        scores = {
+            part_id: count / len(grams)
+            for part_id, count in shared.items()
+            if count / len(grams) >= threshold
+        }
+        return sorted(scores, key=lambda part_id: (-scores[part_id], part_id))
+
+
+fallback_index = InMemorySearchIndex()
+
+
+def order_by_ids(queryset, part_ids):
+    if not part_ids:
+        return queryset.none()
+    ranking = Case(
+        *[When(id=part_id, then=Value(rank)) for rank, part_id in enumerate(part_ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(id__in=part_ids).order_by(ranking)
+
+
+class PartSearchFilter(filters.SearchFilter):
+    """
+    Ranked full-text search over ``PartSearchDocument``.
+
+    Uses the GIN-indexed tsvector on PostgreSQL and ``fallback_index``
+    everywhere else. Every term is matched as a prefix.
+
+    With ``?fuzzy=1`` the search is typo tolerant instead: parts are matched
+    and ranked by trigram word similarity of their title (name, SKU and OEM
+    numbers), backed by a GIN ``gin_trgm_ops`` index on PostgreSQL.
+    """
+
+    fuzzy_param = 'fuzzy'
+
+    def is_fuzzy(self, request):
+        return request.query_params.get(self.fuzzy_param) in ('1', 'true')
+
+    def filter_fuzzy(self, queryset, text):
+        if connection.vendor != 'postgresql':
+            return order_by_ids(queryset, fallback_index.fuzzy_search(text))
+
+        title = F('search_document__title')
+        return (
+            queryset.filter(TrigramWordSimilar(title, Value(text)))
+            .annotate(search_rank=TrigramWordSimilarity(text, title))
+            .order_by('-search_rank', 'id')
+        )
+
+    def get_search_tokens(self, request):
+        return [
+            token for term in self.get_search_terms(request) for token in tokenize(term)
+        ]
+
+    def filter_queryset(self, request, queryset, view):
+        tokens = self.get_search_tokens(request)
+        if not tokens:
+            return queryset
+        if self.is_fuzzy(request):
+            return self.filter_fuzzy(queryset, ' '.join(tokens))
+
+        if connection.vendor != 'postgresql':
+            return order_by_ids(queryset, fallback_index.search(tokens))
+
+        query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in tokens),
+            search_type='raw',
+            config=SEARCH_CONFIG,
+        )
+        return (
+            queryset.filter(search_document__search_vector=query)
+            .annotate(
+                search_rank=SearchRank(F('search_document__search_vector'), query)
+            )
+            .order_by('-search_rank', 'id')
+        )
@@ -2,8 +2,10 @@ from rest_framework import serializers
 
 from .models import Brand, CarModel, Category, CategoryParent, Part, PartImage
 
+PART_LOOKUP_LIMIT = 500
 
-class ImageSerializer(serializers.Serializer):
+
+class ImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = PartImage
         fields = ['id', 'image', 'caption']
@@ -34,6 +36,44 @@ class PartSerializer(serializers.ModelSerializer):
         ]
 
 
+class PartStockSerializer(serializers.ModelSerializer):
+    stock_status = serializers.ReadOnlyField()
+    available_quantity = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Part
+        fields = [
+            'id',
+            'sku',
+            'oem_number',
+            'name',
+            'price',
+            'quantity',
+            'available_quantity',
+            'stock_status',
+            'is_active',
+        ]
+
+
+class PartLookupSerializer(serializers.Serializer):
+    skus = serializers.ListField(
+        child=serializers.CharField(max_length=50), required=False, default=list
+    )
+    oem_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False, default=list
+    )
+
+    def validate(self, attrs):
+        total = len(attrs['skus']) + len(attrs['oem_numbers'])
+        if not total:
+            raise serializers.ValidationError('Provide skus or oem_numbers.')
+        if total > PART_LOOKUP_LIMIT:
+            raise serializers.ValidationError(
+                f'At most {PART_LOOKUP_LIMIT} skus and oem_numbers per request.'
+            )
+        return attrs
+
+
 class CategoryFilterSerializer(serializers.ModelSerializer):
     class Meta:
         model = CategoryParent
@@ -46,6 +86,33 @@ class SubCategoryFilterSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'parent']
 
 
+class CategoryTreeChildSerializer(serializers.ModelSerializer):
+    part_count = serializers.IntegerField(read_only=True)
+    active_part_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'slug', 'part_count', 'active_part_count']
+
+
+class CategoryTreeSerializer(serializers.ModelSerializer):
+    part_count = serializers.IntegerField(read_only=True)
+    active_part_count = serializers.IntegerField(read_only=True)
+    children = CategoryTreeChildSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = CategoryParent
+        fields = [
+            'id',
+            'name',
+            'slug',
+            'icon',
+            'part_count',
+            'active_part_count',
+            'children',
+        ]
+
+
 class BrandFilterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Brand
@@ -0,0 +1,161 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api.utils.cache import bump_version
+
+from . import category_counts, fitment, oem, search, typeahead
+from .models import (Brand, CarModel, Category, CategoryParent, Compatibility,
+                     Part, PartImage, PartTombstone)
+
+TAXONOMY_CACHE = 'store:taxonomy'
+
+
+def reindex_on_commit(part_id):
+    transaction.on_commit(lambda: search.index_parts([part_id]))
+
+
+@receiver(pre_save, sender=Compatibility)
+def remember_fitment(sender, instance, raw=False, **kwargs):
+    instance._indexed_fitment = None
+    if instance.pk is not None and not raw:
+        instance._indexed_fitment = (
+            Compatibility.objects.filter(pk=instance.pk)
+            .values_list('part_id', 'car_model_id')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Compatibility)
+def index_compatibility(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_indexed_fitment', None)
+    fitment.index_compatibility(instance, previous)
+    reindex_on_commit(instance.part_id)
+    if previous is not None and previous[0] != instance.part_id:
+        reindex_on_commit(previous[0])
+
+
+@receiver(post_delete, sender=Compatibility)
+def unindex_compatibility(sender, instance, **kwargs):
+    fitment.unindex_compatibility(instance)
+    reindex_on_commit(instance.part_id)
+
+
+@receiver(post_save, sender=Part)
+def sync_part(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        fitment.sync_part(instance)
+    oem.sync_part(instance)
+    reindex_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=CarModel)
+def sync_car_model(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        fitment.rebuild_years([instance.pk])
+        return
+    fitment.sync_car_model(instance)
+    search.mark_vehicle_stale(car_model=instance.pk)
+
+
+@receiver(post_save, sender=Brand)
+def sync_brand(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    search.mark_vehicle_stale(brand=instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def sync_category(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    search.mark_stale(category=instance.pk)
+
+
+@receiver(post_save, sender=CategoryParent)
+def sync_category_parent(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    search.mark_stale(category_parent=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=CategoryParent)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Brand)
+@receiver([post_save, post_delete], sender=CarModel)
+def bump_taxonomy_version(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(TAXONOMY_CACHE))
+
+
+@receiver(post_save, sender=Part)
+def suggest_part(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: typeahead.index_part(instance))
+
+
+@receiver(post_save, sender=Brand)
+def suggest_brand(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: typeahead.index_brand(instance))
+
+
+@receiver(post_save, sender=CarModel)
+def suggest_car_model(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: typeahead.index_car_model(instance))
+
+
+@receiver(post_delete, sender=Part)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=CarModel)
+def unsuggest(sender, instance, **kwargs):
+    kind = {
+        Part: typeahead.PART,
+        Brand: typeahead.BRAND,
+        CarModel: typeahead.CAR_MODEL,
+    }[sender]
+    pk = instance.pk
+    transaction.on_commit(lambda: typeahead.index.remove(kind, pk))
+
+
+@receiver(pre_save, sender=Part)
+def remember_counted_state(sender, instance, **kwargs):
+    instance._counted_state = None
+    if instance.pk is not None:
+        instance._counted_state = category_counts.stored_state(instance.pk)
+
+
+@receiver(post_save, sender=Part)
+def count_saved_part(sender, instance, **kwargs):
+    old = getattr(instance, '_counted_state', None)
+    new = category_counts.part_state(instance)
+    category_counts.apply(category_counts.diff(old, new))
+    instance._counted_state = new
+
+
+@receiver(post_delete, sender=Part)
+def count_deleted_part(sender, instance, **kwargs):
+    old = category_counts.part_state(instance)
+    category_counts.apply(category_counts.diff(old, None))
+
+
+@receiver([post_save, post_delete], sender=PartImage)
+@receiver([post_save, post_delete], sender=Compatibility)
+def touch_part(sender, instance, raw=False, **kwargs):
+    # QuerySet.update() skips the Part signals and auto_now, only the
+    # delta feed marker moves.
+    if raw:
+        return
+    Part.objects.filter(pk=instance.part_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Part)
+def bury_part(sender, instance, **kwargs):
+    PartTombstone.objects.create(part_id=instance.pk, sku=instance.sku)
@@ -1,3 +1,1254 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import User
+
+from . import (forecasting, inventory, reconciliation, reservations, rollups,
+               typeahead)
+from .models import (ADJUSTMENT, NEW, RESTOCK, SALE, Brand, CarModel, Category,
+                     CategoryParent, CategoryPartCount, Compatibility,
+                     InventoryDailyRollup, InventoryLog, InventoryLogArchive,
+                     OEMReference, Order, OrderItem, Part, PartFitment,
+                     PartImage, PartTombstone, StockReservation)
+from .serializers import PartSerializer
+
+
+class CatalogMixin:
+    """
+    A trader with one category and two car models, plus a ``make_part``
+    factory.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='trader@example.com',
+            username='trader',
+            password='password',
+            is_trader=True,
+        )
+        cls.trader = cls.user.trader_profile
+        cls.category_parent = CategoryParent.objects.create(
+            name='Brakes', slug='brakes'
+        )
+        cls.category = Category.objects.create(
+            name='Brake pads', slug='brake-pads', parent=cls.category_parent
+        )
+        cls.brand = Brand.objects.create(name='BMW')
+        cls.car_model = CarModel.objects.create(
+            brand=cls.brand, name='3 Series', production_start=2010
+        )
+        cls.other_car_model = CarModel.objects.create(
+            brand=cls.brand, name='5 Series', production_start=2012
+        )
+
+    def make_part(self, **fields):
+        values = {
+            'trader': self.trader,
+            'category': self.category,
+            'category_parent': self.category_parent,
+            'name': 'Brake pad',
+            'description': 'Front axle',
+            'price': Decimal('25.00'),
+            'sku': f'SKU-{uuid.uuid4().hex[:8]}',
+            'quantity': 10,
+        }
+        values.update(fields)
+        return Part.objects.create(**values)
+
+
+class FitmentIndexTests(CatalogMixin, TestCase):
+    def fitted_models(self, part):
+        return set(
+            PartFitment.objects.filter(part=part).values_list('car_model_id', flat=True)
+        )
+
+    def test_changing_the_car_model_moves_the_fitment_row(self):
+        part = self.make_part()
+        compatibility = Compatibility.objects.create(
+            part=part, car_model=self.car_model
+        )
+        compatibility.car_model = self.other_car_model
+        compatibility.save()
+
+        self.assertEqual(self.fitted_models(part), {self.other_car_model.pk})
+
+    def test_deleting_a_compatibility_drops_the_fitment_row(self):
+        part = self.make_part()
+        compatibility = Compatibility.objects.create(
+            part=part, car_model=self.car_model
+        )
+        compatibility.delete()
+
+        self.assertEqual(self.fitted_models(part), set())
+
+
+class CachedResponseTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/filters/categories/'
+
+    def cached_timeout(self):
+        with mock.patch('api.views.cache.set') as cache_set:
+            response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return cache_set.call_args.args[2]
+
+    def test_local_memory_entries_expire_quickly(self):
+        self.assertEqual(self.cached_timeout(), 60)
+
+    @mock.patch('api.views.is_shared', return_value=True)
+    def test_shared_cache_entries_last_a_day(self, is_shared):
+        self.assertEqual(self.cached_timeout(), 60 * 60 * 24)
+
+    def test_only_the_params_read_vary_the_entry(self):
+        cache.clear()
+        url = '/api/v1/store/filters/sub-categories/'
+        parent = {'parentId': self.category_parent.pk}
+
+        def names(**params):
+            response = APIClient().get(url, params)
+            return [category['name'] for category in response.json()['data']]
+
+        self.assertEqual(names(**parent, x=1), [self.category.name])
+        # Not bumped outside captureOnCommitCallbacks, so entries are kept
+        Category.objects.create(name='Brake discs', parent=self.category_parent)
+
+        self.assertEqual(names(**parent, x=2), [self.category.name])
+        self.assertEqual(len(names()), 2)
+
+
+class PartListConditionalTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/parts/'
+
+    def test_a_part_leaving_the_filtered_list_changes_last_modified(self):
+        other_category = Category.objects.create(
+            name='Brake discs', slug='brake-discs', parent=self.category_parent
+        )
+        moved = self.make_part()
+        self.make_part()
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Part.objects.update(updated_at=an_hour_ago)
+
+        client = APIClient()
+        params = {'categoryId': self.category.pk}
+        response = client.get(self.url, params)
+        self.assertEqual(response['Last-Modified'], http_date(an_hour_ago.timestamp()))
+
+        moved.category = other_category
+        moved.save()
+
+        response = client.get(
+            self.url, params, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_validators_vary_on_the_renderer(self):
+        self.make_part()
+        client = APIClient()
+        response = client.get(self.url)
+        self.assertIn('Accept', response['Vary'])
+
+        not_modified = client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertIn('Accept', not_modified['Vary'])
+
+        msgpack = client.get(
+            self.url,
+            HTTP_ACCEPT='application/msgpack',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(msgpack.status_code, 200)
+
+
+class OEMReferenceSyncTests(CatalogMixin, TestCase):
+    def references(self, part):
+        return dict(
+            OEMReference.objects.filter(part=part).values_list('number', 'source')
+        )
+
+    def test_manual_references_survive_oem_number_changes(self):
+        part = self.make_part(oem_number='34 11 6 888')
+        OEMReference.objects.create(part=part, raw_number='34 11 6 999')
+
+        part.oem_number = '34 11 6 777'
+        part.save()
+
+        self.assertEqual(
+            self.references(part),
+            {'34116777': OEMReference.PART, '34116999': OEMReference.MANUAL},
+        )
+
+
+class TypeaheadLoadingTests(SimpleTestCase):
+    def make_index(self, *names, gate=None):
+        index = typeahead.TypeaheadIndex()
+        index.loads = 0
+
+        def rows():
+            index.loads += 1
+            if gate is not None:
+                gate.wait(5)
+            for pk, name in enumerate(names, 1):
+                yield typeahead.BRAND, pk, name, ()
+
+        index._rows = rows
+        return index
+
+    def labels(self, index, query):
+        return [suggestion['label'] for suggestion in index.suggest(query)]
+
+    def test_concurrent_first_use_loads_once(self):
+        gate = threading.Event()
+        index = self.make_index('BMW', gate=gate)
+        threads = [threading.Thread(target=index.ensure_loaded) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        gate.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(index.loads, 1)
+        self.assertEqual(self.labels(index, 'bm'), ['BMW'])
+
+    def test_stale_index_is_served_while_reloading(self):
+        index = self.make_index('BMW')
+        index.ensure_loaded()
+        gate = threading.Event()
+        index._rows = self.make_index('BMW', 'Audi', gate=gate)._rows
+        index.loaded_at -= typeahead.REFRESH_INTERVAL + 1
+
+        self.assertEqual(self.labels(index, 'au'), [])
+        index.add(typeahead.BRAND, 3, 'Opel')
+        gate.set()
+        with index.load_lock:
+            pass
+
+        self.assertEqual(self.labels(index, 'au'), ['Audi'])
+        self.assertEqual(self.labels(index, 'op'), ['Opel'])
+
+
+class PartLookupTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/parts/lookup/'
+
+    def test_invalid_items_are_reported_by_index(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(self.url, {'skus': ['SKU-1', 'X' * 51]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['skus'])
+
+
+class MigrationTestCase(TransactionTestCase):
+    """
+    Runs store migrations on the test database: data set up at the latest
+    schema survives migrating back to ``migrate_from``.
+    """
+
+    migrate_from = None
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('store', target)])
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes('store'))
+        super().tearDown()
+
+
+class OrderDeductionMigrationTests(CatalogMixin, MigrationTestCase):
+    migrate_from = '0018_oemreference_manual_source'
+
+    def setUp(self):
+        self.setUpTestData()
+
+    def test_order_deductions_become_sales(self):
+        part = self.make_part()
+        deduction = InventoryLog.objects.create(
+            part=part, quantity=-2, log_type=ADJUSTMENT, notes='Order 7 deduction'
+        )
+        count = InventoryLog.objects.create(
+            part=part, quantity=-1, log_type=ADJUSTMENT, notes='Stock count'
+        )
+        rollups.compact()
+
+        self.migrate(self.migrate_from)
+        self.migrate('0019_reclassify_order_deductions')
+
+        self.assertEqual(
+            dict(InventoryLog.objects.values_list('pk', 'log_type')),
+            {deduction.pk: SALE, count.pk: ADJUSTMENT},
+        )
+        rollup = InventoryDailyRollup.objects.values_list('outflow', 'adjustments')
+        self.assertEqual(rollup.get(part=part), (2, -1))
+
+
+class ConcurrentDeductionTests(CatalogMixin, TransactionTestCase):
+    stock = 20
+    workers = 4
+    checkouts = 10
+    # SQLite serializes writers and fails the losers with "database is
+    # locked"; those checkouts are retried until they sell or run short
+    max_attempts = 200
+
+    def setUp(self):
+        self.setUpTestData()
+
+    def checkout(self, part_id):
+        for _ in range(self.max_attempts):
+            try:
+                inventory.deduct(part_id, 1, notes='checkout')
+                return 'sold'
+            except inventory.InsufficientStock:
+                return 'short'
+            except OperationalError:
+                time.sleep(0.001)
+        raise AssertionError('Checkout kept failing on database locks')
+
+    def test_parallel_checkouts_never_oversell(self):
+        part = self.make_part(quantity=self.stock)
+        outcomes = []
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                for _ in range(self.checkouts):
+                    outcome = self.checkout(part.pk)
+                    with lock:
+                        outcomes.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        attempts = self.workers * self.checkouts
+        self.assertEqual(outcomes.count('sold'), self.stock)
+        self.assertEqual(outcomes.count('short'), attempts - self.stock)
+        part.refresh_from_db()
+        self.assertEqual(part.quantity, 0)
+        self.assertEqual(
+            InventoryLog.objects.filter(part=part, notes='checkout').count(),
+            self.stock,
+        )
+
+
+class ReservationTests(CatalogMixin, TestCase):
+    expired = timedelta(minutes=-1)
+
+    def setUp(self):
+        self.part = self.make_part(quantity=10)
+        self.live = reservations.reserve(self.part.pk, 2, 'cart-a')
+        self.stale = reservations.reserve(self.part.pk, 3, 'cart-b', ttl=self.expired)
+        self.other = reservations.reserve(self.part.pk, 1, 'cart-c', ttl=self.expired)
+
+    def reserved(self):
+        self.part.refresh_from_db()
+        return self.part.reserved_quantity
+
+    def test_resync_skips_expired_rows_so_reserve_can_release_them(self):
+        migration = import_module('store.migrations.0020_resync_reserved_quantity')
+        # What 0015 used to backfill: unexpired reservations only
+        Part.objects.filter(pk=self.part.pk).update(reserved_quantity=2)
+
+        migration.resync_reserved(apps, None)
+
+        self.assertEqual(self.reserved(), 2)
+        self.assertEqual(StockReservation.objects.get().pk, self.live.pk)
+        # Short stock sweeps the expired rows of the part before giving up
+        with self.assertRaises(inventory.InsufficientStock):
+            reservations.reserve(self.part.pk, 9, 'cart-d')
+
+    def admin_action(self, name, queryset):
+        model_admin = admin.site._registry[StockReservation]
+        request = RequestFactory().post('/')
+        with mock.patch.object(model_admin, 'message_user'):
+            getattr(model_admin, name)(request, queryset)
+
+    def test_release_expired_only_releases_the_selected_rows(self):
+        selected = StockReservation.objects.filter(pk__in=[self.live.pk, self.stale.pk])
+
+        self.admin_action('release_expired', selected)
+
+        self.assertEqual(
+            set(StockReservation.objects.values_list('pk', flat=True)),
+            {self.live.pk, self.other.pk},
+        )
+        self.assertEqual(self.reserved(), 3)
+
+    def order(self, quantity, session_key=None):
+        order = Order.objects.create(user=self.user, tracking_number=uuid.uuid4())
+        item = OrderItem(
+            order=order, part=self.part, quantity=quantity, price=self.part.price
+        )
+        item.save(session_key=session_key)
+
+    def test_orders_use_up_the_session_reservations(self):
+        reservations.expire()
+        reservations.reserve(self.part.pk, 8, 'cart-a')
+        # Everything left is held for cart-a
+        with self.assertRaises(inventory.InsufficientStock):
+            self.order(10)
+
+        self.order(10, session_key='cart-a')
+
+        self.part.refresh_from_db()
+        self.assertEqual((self.part.quantity, self.part.reserved_quantity), (0, 0))
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_admin_deletes_give_the_units_back(self):
+        self.admin_action(
+            'delete_queryset', StockReservation.objects.filter(pk=self.live.pk)
+        )
+
+        self.assertEqual(self.reserved(), 4)
+
+
+class ArchiveTests(CatalogMixin, TestCase):
+    def test_archived_logs_keep_their_user(self):
+        part = self.make_part()
+        log = InventoryLog.objects.create(
+            part=part, quantity=5, log_type=RESTOCK, created_by=self.user
+        )
+        rollups.compact()
+
+        self.assertEqual(rollups.archive(timezone.now()), 1)
+        archived = InventoryLogArchive.objects.get(pk=log.pk)
+        self.assertEqual(archived.created_by_id, self.user.pk)
+
+
+class RollupTests(CatalogMixin, TestCase):
+    def log(self, part, quantity, created_at=None):
+        log = InventoryLog.objects.create(
+            part=part, quantity=quantity, log_type=RESTOCK
+        )
+        if created_at is not None:
+            InventoryLog.objects.filter(pk=log.pk).update(created_at=created_at)
+
+    def test_logs_committed_late_are_still_compacted(self):
+        part = self.make_part()
+        self.log(part, 5)
+        rollups.compact()
+        # A long import transaction commits a row stamped before that run
+        yesterday = timezone.now() - timedelta(days=1)
+        self.log(part, 3, created_at=yesterday)
+        rollups.compact()
+
+        balances, _ = rollups.ledger_balances([part.pk])
+        self.assertEqual(balances[part.pk], 8)
+        self.assertFalse(InventoryLog.objects.filter(compacted=False).exists())
+        self.assertEqual(
+            dict(part.rollups.values_list('day', 'closing_balance')),
+            {timezone.localdate(yesterday): 3, timezone.localdate(): 8},
+        )
+
+
+class PartImportTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/parts/import/'
+    header = 'sku,name,category,price,quantity,car_models,images\n'
+
+    def upload(self, content, mode=None, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.user)
+        url = self.url if mode is None else f'{self.url}?mode={mode}'
+        upload = SimpleUploadedFile('parts.csv', content.encode(), 'text/csv')
+        return client.post(url, {'file': upload}, format='multipart')
+
+    def logs(self, part):
+        return list(
+            InventoryLog.objects.filter(part=part)
+            .order_by('id')
+            .values_list('log_type', 'quantity')
+        )
+
+    def test_full_import_upserts_parts_and_logs_stock(self):
+        response = self.upload(
+            self.header
+            + f'PAD-1,Front pad,{self.category.slug},19.90,5,'
+            + f'{self.car_model.pk},pads/1.jpg\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['created'], 1)
+        part = Part.objects.get(sku='PAD-1')
+        self.assertEqual(part.trader, self.trader)
+        self.assertEqual(
+            list(
+                Compatibility.objects.filter(part=part).values_list(
+                    'car_model', flat=True
+                )
+            ),
+            [self.car_model.pk],
+        )
+        self.assertEqual(
+            list(part.images.values_list('image', flat=True)), ['pads/1.jpg']
+        )
+
+        response = self.upload(
+            self.header
+            + f'PAD-1,Front pad,{self.category.slug},21.00,8,'
+            + f'{self.other_car_model.pk},\n'
+        )
+        self.assertEqual(response.json()['data']['updated'], 1)
+        part.refresh_from_db()
+        self.assertEqual((part.price, part.quantity), (Decimal('21.00'), 8))
+        self.assertEqual(Compatibility.objects.filter(part=part).count(), 2)
+        self.assertEqual(self.logs(part), [(NEW, 5), (ADJUSTMENT, 3)])
+
+    def test_delta_import_only_touches_price_and_stock(self):
+        part = self.make_part(sku='PAD-1', name='Front pad', quantity=4)
+
+        response = self.upload(
+            'sku,price,quantity,name\nPAD-1,30.00,6,Renamed\nPAD-404,1.00,,\n',
+            mode='delta',
+        )
+
+        data = response.json()['data']
+        self.assertEqual((data['created'], data['updated']), (0, 1))
+        self.assertEqual(
+            data['errors'], [{'row': 2, 'message': "Unknown sku 'PAD-404'"}]
+        )
+        part.refresh_from_db()
+        self.assertEqual(
+            (part.name, part.price, part.quantity),
+            ('Front pad', Decimal('30.00'), 6),
+        )
+        self.assertEqual(self.logs(part), [(ADJUSTMENT, 2)])
+
+    def test_row_errors_are_reported_by_data_row(self):
+        response = self.upload(
+            self.header
+            + f'PAD-1,Front pad,{self.category.slug},19.90,,,\n'
+            + f'PAD-2,Rear pad,{self.category.slug},,,,\n'
+            + 'PAD-3,Rear pad,no-such-category,5,,,\n'
+            + f'PAD-1,Front pad,{self.category.slug},19.90,,,\n'
+        )
+
+        data = response.json()['data']
+        self.assertEqual(data['created'], 1)
+        self.assertEqual(data['error_count'], 3)
+        self.assertEqual(
+            data['errors'],
+            [
+                {'row': 2, 'message': 'Missing price'},
+                {'row': 3, 'message': "Unknown category 'no-such-category'"},
+                {'row': 4, 'message': "Duplicate sku 'PAD-1'"},
+            ],
+        )
+
+    def test_other_traders_skus_are_left_alone(self):
+        rival = User.objects.create_user(
+            email='rival@example.com',
+            username='rival',
+            password='password',
+            is_trader=True,
+        )
+        part = self.make_part(sku='PAD-1', trader=rival.trader_profile)
+
+        response = self.upload(
+            self.header + f'PAD-1,Stolen,{self.category.slug},1.00,99,,\n'
+        )
+
+        self.assertEqual(
+            response.json()['data']['errors'],
+            [{'row': 1, 'message': "sku 'PAD-1' belongs to another trader"}],
+        )
+        part.refresh_from_db()
+        self.assertEqual((part.name, part.quantity), ('Brake pad', 10))
+
+    def test_non_traders_are_forbidden(self):
+        customer = User.objects.create_user(
+            email='customer@example.com', username='customer', password='password'
+        )
+
+        response = self.upload(self.header, user=customer)
+
+        self.assertEqual(response.status_code, 403)
+
+
+class ReconciliationTests(CatalogMixin, TransactionTestCase):
+    def setUp(self):
+        self.setUpTestData()
+        self.part = self.make_part(quantity=10)
+        InventoryLog.objects.create(part=self.part, quantity=10, log_type=NEW)
+
+    def reconcile(self, fix=True):
+        drifted = []
+        for _, rows in reconciliation.reconcile(fix=fix, workers=2):
+            drifted.extend(rows)
+        return drifted
+
+    def adjustments(self):
+        return list(
+            InventoryLog.objects.filter(log_type=ADJUSTMENT).values_list(
+                'part_id', 'quantity'
+            )
+        )
+
+    def test_matching_ledger_is_left_alone(self):
+        rollups.compact()
+        InventoryLog.objects.create(part=self.part, quantity=-2, log_type=SALE)
+        Part.objects.filter(pk=self.part.pk).update(quantity=8)
+
+        self.assertEqual(self.reconcile(), [])
+        self.assertEqual(self.adjustments(), [])
+
+    def test_drifted_part_gets_one_correcting_log(self):
+        Part.objects.filter(pk=self.part.pk).update(quantity=13)
+
+        self.assertEqual(self.reconcile(), [(self.part.pk, self.part.sku, 13, 10)])
+        self.assertEqual(self.reconcile(), [])
+        self.assertEqual(self.adjustments(), [(self.part.pk, 3)])
+
+    def test_compaction_between_ledger_reads_is_retried(self):
+        ledger_balances = rollups.ledger_balances
+        reads = []
+
+        def compacting_mid_read(part_ids):
+            balances, compacted_at = ledger_balances(part_ids)
+            if not reads:
+                # A batch committing between the rollup and raw log reads
+                # counts its logs twice
+                rollups.compact()
+                balances = {pk: balance * 2 for pk, balance in balances.items()}
+            reads.append(compacted_at)
+            return balances, compacted_at
+
+        with mock.patch.object(rollups, 'ledger_balances', compacting_mid_read):
+            self.assertEqual(
+                reconciliation._balances([self.part.pk]), {self.part.pk: 10}
+            )
+        self.assertEqual(len(reads), 2)
+
+
+class ChangesFeedTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/parts/changes/'
+
+    def setUp(self):
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def changed_part(self, minutes, **fields):
+        part = self.make_part(approved=True, **fields)
+        Part.objects.filter(pk=part.pk).update(
+            updated_at=self.start + timedelta(minutes=minutes)
+        )
+        return part
+
+    def get(self, **params):
+        response = APIClient().get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def ops(self, data):
+        return [(change['op'], change['id']) for change in data['changes']]
+
+    def test_cursor_round_trip(self):
+        parts = [self.changed_part(minutes) for minutes in (1, 2, 3)]
+
+        page = self.get(since=self.start.isoformat(), limit=2)
+        self.assertEqual(
+            self.ops(page), [('upsert', parts[0].pk), ('upsert', parts[1].pk)]
+        )
+        self.assertTrue(page['has_more'])
+
+        page = self.get(cursor=page['cursor'], limit=2)
+        self.assertEqual(self.ops(page), [('upsert', parts[2].pk)])
+        self.assertFalse(page['has_more'])
+
+        last = self.get(cursor=page['cursor'])
+        self.assertEqual((last['changes'], last['cursor']), ([], page['cursor']))
+
+    def test_ties_on_updated_at_are_paged_by_id(self):
+        parts = [self.changed_part(1) for _ in range(3)]
+
+        seen, cursor = [], None
+        for _ in parts:
+            params = {'cursor': cursor} if cursor else {'since': self.start.isoformat()}
+            page = self.get(limit=1, **params)
+            seen.extend(self.ops(page))
+            cursor = page['cursor']
+
+        self.assertEqual(seen, [('upsert', part.pk) for part in parts])
+
+    def test_removed_and_hidden_parts_are_deletes(self):
+        hidden = self.changed_part(1, is_active=False)
+        removed = self.changed_part(2)
+        removed_pk = removed.pk
+        removed.delete()
+        PartTombstone.objects.update(removed_at=self.start + timedelta(minutes=3))
+
+        page = self.get(since=self.start.isoformat())
+
+        self.assertEqual(
+            self.ops(page), [('delete', hidden.pk), ('delete', removed_pk)]
+        )
+        self.assertEqual(page['changes'][1]['sku'], removed.sku)
+
+    def test_invalid_parameters_are_rejected(self):
+        client = APIClient()
+        for params in ({'since': 'yesterday'}, {'limit': 'ten'}, {'cursor': 'junk'}):
+            with self.subTest(params=params):
+                response = client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(params)), response.json())
+
+
+class KeysetPaginationTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/parts/'
+
+    def setUp(self):
+        self.client = APIClient()
+        # Ties on both is_featured and price, broken by id
+        self.parts = [self.make_part(price=Decimal('30.00'), is_featured=True)] + [
+            self.make_part(price=Decimal(price)) for price in ('10', '10', '20', '20')
+        ]
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def walk(self, response, link):
+        """
+        Follow ``link`` from ``response``, returning each page's ids and the
+        last response.
+        """
+        pages = [self.ids(response)]
+        while response.json()[link]:
+            response = self.client.get(response.json()[link])
+            pages.append(self.ids(response))
+        return pages, response
+
+    def test_pages_forward_and_back_over_ties(self):
+        expected = [part.pk for part in self.parts]
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 2})
+        self.assertIsNone(response.json()['previous'])
+
+        forward, last = self.walk(response, 'next')
+        self.assertEqual(forward, [expected[:2], expected[2:4], expected[4:]])
+
+        backward, first = self.walk(last, 'previous')
+        self.assertEqual(backward, [expected[4:], expected[2:4], expected[:2]])
+        self.assertIsNone(first.json()['previous'])
+
+    def test_client_ordering_is_followed(self):
+        params = {'pagination': 'cursor', 'page_size': 2, 'ordering': '-price'}
+        pages, _ = self.walk(self.client.get(self.url, params), 'next')
+
+        by_price = sorted(self.parts, key=lambda part: (-part.price, part.pk))
+        self.assertEqual(sum(pages, []), [part.pk for part in by_price])
+
+    def test_cursor_from_another_ordering_is_rejected(self):
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 2})
+
+        next_link = response.json()['next']
+
+        response = self.client.get(f'{next_link}&ordering=-price')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_count_only_when_asked_for(self):
+        params = {'pagination': 'cursor', 'page_size': 2}
+        self.assertNotIn('count', self.client.get(self.url, params).json())
+
+        response = self.client.get(self.url, {**params, 'with_count': 1})
+        self.assertEqual(response.json()['count'], len(self.parts))
+        response = self.client.get(response.json()['next'])
+        self.assertEqual(response.json()['count'], len(self.parts))
+
+
+# Local storage, so image URLs are not signed with an expiry
+@override_settings(
+    STORAGES={
+        **settings.STORAGES,
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    }
+)
+class PartReaderTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/parts/'
+
+    def setUp(self):
+        self.parts = [self.make_part(oem_number='34116860242'), self.make_part()]
+        for caption in ('Front', 'Back'):
+            PartImage.objects.create(
+                part=self.parts[0], image=f'part_images/{caption}.jpg', caption=caption
+            )
+
+    def serialized(self, response, parts):
+        # Adding images touches the parts, so serialize them as stored
+        parts = Part.objects.filter(pk__in=[part.pk for part in parts]).order_by('id')
+        context = {'request': response.wsgi_request}
+        data = PartSerializer(parts, many=True, context=context).data
+        return json.loads(JSONRenderer().render(data))
+
+    def test_list_matches_the_serializer(self):
+        response = APIClient().get(self.url)
+
+        self.assertEqual(
+            response.json()['results'], self.serialized(response, self.parts)
+        )
+        images = response.json()['results'][0]['images']
+        self.assertEqual([image['caption'] for image in images], ['Front', 'Back'])
+        self.assertEqual(
+            images[0]['image'], 'http://testserver/media/part_images/Front.jpg'
+        )
+
+    def test_detail_matches_the_serializer(self):
+        part = self.parts[0]
+
+        response = APIClient().get(f'{self.url}{part.pk}/')
+
+        self.assertEqual(response.json()['data'], self.serialized(response, [part])[0])
+
+    def test_sparse_fieldsets_match_the_serializer(self):
+        client = APIClient()
+        for params in (
+            {'fields': 'id,price,images'},
+            {'fields': 'sku,updated_at'},
+            {'omit': 'images,description'},
+        ):
+            with self.subTest(params=params):
+                response = client.get(self.url, params)
+
+                serialized = self.serialized(response, self.parts)
+                fields = params.get('fields', '').split(',')
+                omit = params.get('omit', '').split(',')
+                expected = [
+                    {
+                        name: value
+                        for name, value in item.items()
+                        if (name in fields or 'fields' not in params)
+                        and name not in omit
+                    }
+                    for item in serialized
+                ]
+                self.assertEqual(response.json()['results'], expected)
+
+    def test_unknown_fields_are_rejected(self):
+        response = APIClient().get(self.url, {'fields': 'id,secret'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class PartSearchTests(CatalogMixin, TestCase):
+    """
+    Search through the parts API against the in-memory fallback index.
+    """
+
+    url = '/api/v1/store/parts/'
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_name = self.make_part(name='Ceramic brake pad')
+            self.in_description = self.make_part(
+                name='Wear sensor', description='Fits ceramic pads'
+            )
+            self.other = self.make_part(name='Oil filter', description='Spin-on')
+            Compatibility.objects.create(part=self.in_name, car_model=self.car_model)
+
+    def search(self, text, **params):
+        response = APIClient().get(self.url, {'search': text, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def reindex(self):
+        call_command('reindex_parts', stdout=StringIO())
+
+    def test_title_matches_rank_above_body_matches(self):
+        self.assertEqual(
+            self.search('ceramic'), [self.in_name.pk, self.in_description.pk]
+        )
+
+    def test_terms_match_as_prefixes_and_all_must_match(self):
+        self.assertEqual(self.search('cera'), [self.in_name.pk, self.in_description.pk])
+        self.assertEqual(self.search('cera sens'), [self.in_description.pk])
+        self.assertEqual(self.search('cera spin'), [])
+
+    def test_renamed_brand_is_found_after_reindex(self):
+        self.brand.name = 'Bayerische'
+        self.brand.save()
+        self.assertEqual(self.search('bayer'), [])
+
+        self.reindex()
+
+        self.assertEqual(self.search('bayer'), [self.in_name.pk])
+
+    def test_renamed_category_is_found_after_reindex(self):
+        self.category.name = 'Friction pads'
+        self.category.save()
+        self.assertEqual(self.search('friction'), [])
+
+        self.reindex()
+
+        self.assertEqual(
+            self.search('friction'),
+            [self.in_name.pk, self.in_description.pk, self.other.pk],
+        )
+
+    def test_fuzzy_search_tolerates_typos(self):
+        self.assertEqual(self.search('ceramc'), [])
+
+        self.assertEqual(self.search('ceramc', fuzzy=1), [self.in_name.pk])
+        self.assertEqual(self.search('oil filtre', fuzzy=1), [self.other.pk])
+
+
+class BulkInventoryTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.active = self.make_part(name='Brake pad', approved=True)
+        self.inactive = self.make_part(
+            name='Brake disc', approved=True, is_active=False
+        )
+        self.an_hour_ago = timezone.now() - timedelta(hours=1)
+        Part.objects.update(updated_at=self.an_hour_ago)
+        index = mock.patch.object(typeahead, 'index', typeahead.TypeaheadIndex())
+        index.start()
+        self.addCleanup(index.stop)
+
+    def counts(self):
+        row = CategoryPartCount.objects.get(category=self.category)
+        return row.total, row.active
+
+    def suggested(self, query):
+        return [suggestion['id'] for suggestion in typeahead.index.suggest(query)]
+
+    def test_restock_many_adds_units_and_logs_each_part(self):
+        restocked = inventory.restock_many(Part.objects.all(), quantity=5)
+
+        self.assertEqual(restocked, 2)
+        for part in Part.objects.all():
+            self.assertEqual(part.quantity, 15)
+            self.assertGreater(part.updated_at, self.an_hour_ago)
+        logs = InventoryLog.objects.filter(log_type=RESTOCK)
+        self.assertEqual(
+            sorted(logs.values_list('part_id', 'quantity')),
+            [(self.active.pk, 5), (self.inactive.pk, 5)],
+        )
+
+    def test_restock_many_defaults_to_the_reorder_quantity(self):
+        Part.objects.filter(pk=self.active.pk).update(reorder_quantity=7)
+        Part.objects.filter(pk=self.inactive.pk).update(reorder_quantity=0)
+
+        restocked = inventory.restock_many(Part.objects.order_by('-price'))
+
+        self.assertEqual(restocked, 1)
+        self.active.refresh_from_db()
+        self.inactive.refresh_from_db()
+        self.assertEqual((self.active.quantity, self.inactive.quantity), (17, 10))
+        self.assertEqual(self.inactive.updated_at, self.an_hour_ago)
+
+    def test_toggle_active_keeps_counts_and_typeahead_in_step(self):
+        self.assertEqual(self.counts(), (2, 1))
+        self.assertEqual(self.suggested('brake'), [self.active.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            toggled = inventory.toggle_active(Part.objects.all())
+
+        self.assertEqual(toggled, 2)
+        self.assertEqual(self.counts(), (2, 1))
+        self.assertEqual(self.suggested('brake'), [self.inactive.pk])
+        for part in Part.objects.all():
+            self.assertGreater(part.updated_at, self.an_hour_ago)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.toggle_active(Part.objects.filter(pk=self.inactive.pk))
+
+        self.assertEqual(self.counts(), (2, 0))
+        self.assertEqual(self.suggested('brake'), [])
+
+
+class CategoryTreeTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/filters/category-tree/'
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        [parent] = response.json()['data']
+        [child] = parent['children']
+        self.assertEqual(child['id'], self.category.pk)
+        return (
+            (parent['part_count'], parent['active_part_count']),
+            (child['part_count'], child['active_part_count']),
+        )
+
+    def test_counts_follow_part_changes(self):
+        part = self.make_part(approved=True)
+        self.make_part()
+        self.assertEqual(self.counts(), ((2, 1), (2, 1)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            part.is_active = False
+            part.save()
+
+        self.assertEqual(self.counts(), ((2, 0), (2, 0)))
+
+
+class PartFacetsTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/facets/'
+
+    def setUp(self):
+        cache.clear()
+        cheap = self.make_part(price=Decimal('10.00'))
+        both = self.make_part(price=Decimal('30.00'))
+        self.make_part(price=Decimal('30.00'))
+        for part, car_model in (
+            (cheap, self.car_model),
+            (both, self.car_model),
+            (both, self.other_car_model),
+        ):
+            Compatibility.objects.create(part=part, car_model=car_model)
+
+    def facets(self, **params):
+        response = APIClient().get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        prices = {price['min']: price['count'] for price in data.pop('prices')}
+        return data, prices
+
+    def test_counts_every_facet(self):
+        data, prices = self.facets()
+
+        self.assertEqual(data['brands'], [{'id': self.brand.pk, 'count': 2}])
+        self.assertEqual(
+            data['car_models'],
+            [
+                {'id': self.car_model.pk, 'count': 2},
+                {'id': self.other_car_model.pk, 'count': 1},
+            ],
+        )
+        self.assertEqual(data['categories'], [{'id': self.category.pk, 'count': 3}])
+        self.assertEqual((prices[0], prices[25], prices[50]), (1, 2, 0))
+
+    def test_counts_follow_the_part_filters(self):
+        data, prices = self.facets(compatibleModel=self.other_car_model.pk)
+
+        self.assertEqual(data['brands'], [{'id': self.brand.pk, 'count': 1}])
+        self.assertEqual(data['categories'], [{'id': self.category.pk, 'count': 1}])
+        self.assertEqual((prices[0], prices[25]), (0, 1))
+
+
+class YearFilterTests(CatalogMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ended_model = CarModel.objects.create(
+            brand=self.brand, name='E46', production_start=1998, production_end=2006
+        )
+        self.parts = {}
+        for car_model in (self.ended_model, self.car_model, self.other_car_model):
+            part = self.make_part()
+            Compatibility.objects.create(part=part, car_model=car_model)
+            self.parts[car_model.pk] = part.pk
+
+    def get(self, url, year):
+        response = APIClient().get(url, {'year': year})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def part_ids(self, year):
+        data = self.get('/api/v1/store/parts/', year)
+        return sorted(row['id'] for row in data['results'])
+
+    def car_model_ids(self, year):
+        data = self.get('/api/v1/store/filters/car-models/', year)
+        return sorted(row['id'] for row in data['data'])
+
+    def test_parts_fit_models_built_that_year(self):
+        parts = self.parts
+        self.assertEqual(self.part_ids(2000), [parts[self.ended_model.pk]])
+        self.assertEqual(self.part_ids(2011), [parts[self.car_model.pk]])
+        self.assertEqual(
+            self.part_ids(2015),
+            sorted([parts[self.car_model.pk], parts[self.other_car_model.pk]]),
+        )
+        self.assertEqual(self.part_ids(2008), [])
+
+    def test_car_models_built_that_year(self):
+        self.assertEqual(self.car_model_ids(2006), [self.ended_model.pk])
+        self.assertEqual(
+            self.car_model_ids(2012), [self.car_model.pk, self.other_car_model.pk]
+        )
+
+    def test_changed_production_years_are_followed(self):
+        self.ended_model.production_end = 2009
+        self.ended_model.save()
+
+        self.assertEqual(self.part_ids(2008), [self.parts[self.ended_model.pk]])
+
+    def test_invalid_year_is_rejected(self):
+        response = APIClient().get('/api/v1/store/parts/', {'year': 'last'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('year', response.json())
+
+
+class PartExportTests(CatalogMixin, TestCase):
+    url = '/api/v1/store/parts/export/'
+
+    def setUp(self):
+        self.parts = [
+            self.make_part(approved=True, price=Decimal('12.50')),
+            self.make_part(approved=True, oem_number='34116860242'),
+        ]
+        self.make_part(approved=True, is_active=False)
+        self.make_part()
+
+    def export(self, **params):
+        response = APIClient().get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode(), response
+
+    def test_ndjson_streams_active_approved_parts(self):
+        content, response = self.export()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [part.pk for part in self.parts])
+        self.assertEqual(rows[0]['price'], '12.50')
+        self.assertEqual(rows[1]['images'], [])
+
+    def test_csv_takes_sparse_fieldsets(self):
+        content, response = self.export(**{'as': 'csv', 'fields': 'sku,oem_number'})
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            content.splitlines(),
+            [
+                'sku,oem_number',
+                f'{self.parts[0].sku},',
+                f'{self.parts[1].sku},34116860242',
+            ],
+        )
+
+    def test_unknown_format_is_rejected(self):
+        response = APIClient().get(self.url, {'as': 'xml'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ReorderReportTests(CatalogMixin, TransactionTestCase):
+    # The report reads each trader on a worker thread, which only sees
+    # committed rows
+    def setUp(self):
+        self.setUpTestData()
+        other = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='password',
+            is_trader=True,
+        )
+        self.selling = self.make_part(
+            quantity=5, low_stock_threshold=5, reorder_quantity=10
+        )
+        InventoryLog.objects.create(part=self.selling, quantity=-60, log_type=SALE)
+        self.reserved = self.make_part(
+            quantity=12, low_stock_threshold=5, reorder_quantity=10
+        )
+        Part.objects.filter(pk=self.reserved.pk).update(reserved_quantity=8)
+        self.make_part(quantity=50, low_stock_threshold=5)
+        self.make_part(quantity=1, low_stock_threshold=5, is_active=False)
+        self.out_of_stock = self.make_part(
+            trader=other.trader_profile,
+            quantity=0,
+            low_stock_threshold=5,
+            reorder_quantity=3,
+        )
+
+    def report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'reorder.json')
+            call_command(
+                'check_stock',
+                output=path,
+                output_format='json',
+                workers=2,
+                stdout=StringIO(),
+            )
+            with open(path) as report:
+                return json.load(report)
+
+    def test_low_stock_parts_are_reported_per_trader(self):
+        traders = self.report()
+
+        suggested = [
+            [(part['part_id'], part['suggested_quantity']) for part in trader['parts']]
+            for trader in traders
+        ]
+        self.assertEqual(
+            suggested,
+            [
+                # 60 sold over 30 days is 2 a day, 28 more covers 14 days
+                [(self.selling.pk, 28), (self.reserved.pk, 10)],
+                [(self.out_of_stock.pk, 5)],
+            ],
+        )
+        self.assertEqual(traders[0]['parts'][1]['available'], 4)
+
+
+@skipIf(forecasting.np is None, 'numpy is not installed')
+class ForecastTests(CatalogMixin, TestCase):
+    def setUp(self):
+        self.steady = self.make_part(low_stock_threshold=5, reorder_quantity=10)
+        self.unsold = self.make_part(low_stock_threshold=5, reorder_quantity=10)
+        now = timezone.now()
+        for days_ago in range(1, 11):
+            log = InventoryLog.objects.create(
+                part=self.steady, quantity=-2, log_type=SALE
+            )
+            InventoryLog.objects.filter(pk=log.pk).update(
+                created_at=now - timedelta(days=days_ago)
+            )
+
+    def levels(self, part):
+        part.refresh_from_db()
+        return part.low_stock_threshold, part.reorder_quantity
+
+    def forecast(self, *args):
+        call_command('forecast_reorder_levels', '--days=10', *args, stdout=StringIO())
+
+    def test_steady_demand_sets_threshold_and_reorder_quantity(self):
+        self.forecast()
+
+        # 2 a day with no variance: 7 lead time days, 14 cover days
+        self.assertEqual(self.levels(self.steady), (14, 28))
+        self.assertEqual(self.levels(self.unsold), (5, 10))
+
+    def test_compacted_sales_forecast_the_same(self):
+        rollups.compact()
+        self.assertFalse(InventoryLog.objects.filter(compacted=False).exists())
+
+        self.forecast('--method=sma')
+
+        self.assertEqual(self.levels(self.steady), (14, 28))
+
+    def test_dry_run_writes_nothing(self):
+        self.forecast('--dry-run')
+
+        self.assertEqual(self.levels(self.steady), (5, 10))
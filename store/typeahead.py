@@ -0,0 +1,240 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.db import connection
+
+from .models import Brand, CarModel, Part
+
+BRAND = 'brand'
+CAR_MODEL = 'car_model'
+PART = 'part'
+KIND_RANKS = {BRAND: 0, CAR_MODEL: 1, PART: 2}
+
+MAX_ENTRIES = 200_000
+MAX_KEYS_PER_ENTRY = 6
+MAX_KEY_LENGTH = 40
+MAX_SCAN = 500
+MAX_QUERY_LENGTH = 50
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+REFRESH_INTERVAL = 60 * 15
+
+NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize(text):
+    """
+    "  BMW  3-Series " -> "bmw 3 series"
+    """
+    return ' '.join(NON_WORD_RE.sub(' ', (text or '').lower()).split())
+
+
+def entry_keys(label, *codes):
+    """
+    Prefix keys of an entry: the label and its trailing word runs, so "bmw 3
+    series" is found by "bmw", "3 se" and "series", plus compacted codes (SKU)
+    so "sku00" finds "SKU-0001".
+    """
+    keys = []
+    words = normalize(label).split()
+    for position in range(len(words)):
+        keys.append(' '.join(words[position:])[:MAX_KEY_LENGTH])
+    for code in codes:
+        keys.append(normalize(code).replace(' ', '')[:MAX_KEY_LENGTH])
+    return list(dict.fromkeys(key for key in keys if key))[:MAX_KEYS_PER_ENTRY]
+
+
+class TypeaheadIndex:
+    """
+    Sorted array of ``(key, rank, kind, id)`` prefix keys for brand, car model
+    and part suggestions, answered with a binary search and a bounded scan.
+
+    Loaded lazily once per process and then updated in place by
+    ``store.signals``. Since signals only reach the process that saved the
+    object, the index is also reloaded every ``REFRESH_INTERVAL`` seconds so
+    other workers converge; the stale index keeps being served while a
+    background thread reloads it, and changes made during a reload are
+    replayed onto the new index. At most ``max_entries`` objects are held;
+    further objects are skipped until the next reload.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # Held by the one thread (re)loading the index
+        self.load_lock = threading.Lock()
+        self.loaded_at = None
+        self.entries = {}
+        self.keys = []
+        # Changes made while a load is running, None otherwise
+        self.changes = None
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def _rows(self):
+        for brand_id, name in Brand.objects.values_list('id', 'name').iterator():
+            yield BRAND, brand_id, name, ()
+        car_models = CarModel.objects.values_list('id', 'brand__name', 'name')
+        for car_model_id, brand_name, name in car_models.iterator():
+            yield CAR_MODEL, car_model_id, f'{brand_name} {name}', ()
+        parts = Part.objects.filter(is_active=True).values_list('id', 'name', 'sku')
+        for part_id, name, sku in parts.iterator(chunk_size=5000):
+            yield PART, part_id, name, (sku,)
+
+    def load(self):
+        with self.lock:
+            if self.changes is None:
+                self.changes = []
+        entries, keys = {}, []
+        try:
+            for kind, pk, label, codes in self._rows():
+                if len(entries) >= self.max_entries:
+                    break
+                entry_key_list = entry_keys(label, *codes)
+                entries[kind, pk] = (label, entry_key_list)
+                rank = KIND_RANKS[kind]
+                keys.extend((key, rank, kind, pk) for key in entry_key_list)
+            keys.sort()
+        except Exception:
+            with self.lock:
+                self.changes = None
+            raise
+        with self.lock:
+            self.entries, self.keys = entries, keys
+            for kind, pk, label, codes in self.changes:
+                if label is None:
+                    self._remove(kind, pk)
+                else:
+                    self._add(kind, pk, label, codes)
+            self.changes = None
+            self.loaded_at = time.monotonic()
+
+    def _refresh(self):
+        try:
+            self.load()
+        finally:
+            self.load_lock.release()
+            connection.close()
+
+    def ensure_loaded(self):
+        """
+        Load the index on first use, once: concurrent first callers wait for
+        it. Once stale, it is reloaded in a background thread and served as
+        is meanwhile.
+        """
+        if not self.loaded:
+            with self.load_lock:
+                if not self.loaded:
+                    self.load()
+        elif time.monotonic() - self.loaded_at > REFRESH_INTERVAL:
+            if self.load_lock.acquire(blocking=False):
+                # Record changes from now on, before the thread gets going
+                with self.lock:
+                    self.changes = []
+                threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _remove(self, kind, pk):
+        entry = self.entries.pop((kind, pk), None)
+        if entry is None:
+            return
+        rank = KIND_RANKS[kind]
+        for key in entry[1]:
+            item = (key, rank, kind, pk)
+            position = bisect_left(self.keys, item)
+            if position < len(self.keys) and self.keys[position] == item:
+                del self.keys[position]
+
+    def _add(self, kind, pk, label, codes):
+        self._remove(kind, pk)
+        if len(self.entries) >= self.max_entries:
+            return
+        entry_key_list = entry_keys(label, *codes)
+        self.entries[kind, pk] = (label, entry_key_list)
+        rank = KIND_RANKS[kind]
+        for key in entry_key_list:
+            insort(self.keys, (key, rank, kind, pk))
+
+    def add(self, kind, pk, label, *codes):
+        """
+        Insert or replace a single entry. A no-op until the index is loaded
+        (or being loaded).
+        """
+        with self.lock:
+            if self.changes is not None:
+                self.changes.append((kind, pk, label, codes))
+            if self.loaded:
+                self._add(kind, pk, label, codes)
+
+    def remove(self, kind, pk):
+        with self.lock:
+            if self.changes is not None:
+                self.changes.append((kind, pk, None, ()))
+            if self.loaded:
+                self._remove(kind, pk)
+
+    def suggest(self, query, limit=DEFAULT_LIMIT):
+        """
+        Up to ``limit`` suggestions whose key starts with ``query``: exact
+        matches first, then brands, car models and parts, shortest key first.
+        """
+        prefix = normalize(query[:MAX_QUERY_LENGTH])
+        if not prefix:
+            return []
+        self.ensure_loaded()
+
+        suggestions, seen = [], set()
+        with self.lock:
+            position = bisect_left(self.keys, (prefix,))
+            end = min(position + MAX_SCAN, len(self.keys))
+            candidates = []
+            while position < end and self.keys[position][0].startswith(prefix):
+                key, rank, kind, pk = self.keys[position]
+                candidates.append((key != prefix, rank, len(key), key, kind, pk))
+                position += 1
+
+            for *_, kind, pk in sorted(candidates):
+                if (kind, pk) in seen:
+                    continue
+                seen.add((kind, pk))
+                label = self.entries[kind, pk][0]
+                suggestions.append({'type': kind, 'id': pk, 'label': label})
+                if len(suggestions) >= limit:
+                    break
+        return suggestions
+
+
+index = TypeaheadIndex()
+
+
+def index_part(part):
+    if part.is_active:
+        index.add(PART, part.pk, part.name, part.sku)
+    else:
+        index.remove(PART, part.pk)
+
+
+def index_parts(part_ids):
+    """
+    Refresh the entries of parts changed by bulk updates, which skip the
+    save signals.
+    """
+    if index.loaded:
+        for part in Part.objects.filter(pk__in=part_ids).only(
+            'name', 'sku', 'is_active'
+        ):
+            index_part(part)
+
+
+def index_brand(brand):
+    index.add(BRAND, brand.pk, brand.name)
+    if index.loaded:
+        for car_model_id, name in brand.models.values_list('id', 'name'):
+            index.add(CAR_MODEL, car_model_id, f'{brand.name} {name}')
+
+
+def index_car_model(car_model):
+    index.add(CAR_MODEL, car_model.pk, f'{car_model.brand.name} {car_model.name}')
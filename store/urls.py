@@ -1,8 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .api import (BrandFilterAPIView, CarModelFilterApiView,
-                  CategoryFiltersAPIView, PartViewSet,
+from .api import (AutocompleteAPIView, BrandFilterAPIView,
+                  CarModelFilterApiView, CategoryFiltersAPIView,
+                  CategoryTreeAPIView, PartFacetsAPIView, PartViewSet,
                   SubCategoryFiltersAPIView)
 
 app_name = 'store'
@@ -12,9 +13,16 @@ router.register(r'parts', PartViewSet, basename='part')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('facets/', PartFacetsAPIView.as_view(), name='part-facets'),
+    path('autocomplete/', AutocompleteAPIView.as_view(), name='autocomplete'),
     path(
         'filters/categories/', CategoryFiltersAPIView.as_view(), name='category-filters'
     ),
+    path(
+        'filters/category-tree/',
+        CategoryTreeAPIView.as_view(),
+        name='category-tree',
+    ),
     path(
         'filters/sub-categories/',
         SubCategoryFiltersAPIView.as_view(),